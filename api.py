@@ -0,0 +1,329 @@
+"""API HTTP local para o gerador de combinações e os cálculos financeiros (integração com o PDV).
+
+Uso: python api.py [--host 127.0.0.1] [--porta 8765] [--processos N] [--max-pendentes 64]
+
+Rotas (JSON no corpo e na resposta):
+  GET  /saude               estado do servidor, da fila e contadores
+  POST /combinacao          {"valor": 137.5, "percentual_bebidas": 20, "populacao": 50, "geracoes": 100,
+                             "tipos_sanduiches": 5, "tipos_bebidas": 5}  (só "valor" é obrigatório)
+  POST /combinacoes         {"valores": [137.5, 80.0], ...mesmos parâmetros, comuns a todo o lote}
+  POST /resumo-financeiro   {"vendas": {"Crédito Visa": 1200.0, "PIX": 800.0, "Dinheiro": 300.0},
+                             "transacoes": {"Crédito Visa": 40}, "mes": "2025-06",
+                             "custo_contadora": 316.0, "aliquota_inss": 0.0}
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from http import HTTPStatus
+
+import pandas as pd
+
+from combinacoes import gerar_dados_geneticos
+from financeiro import (
+    TAXAS_ADQUIRENTE, OPCOES_INSS_PATRONAL, ler_recebimentos, ler_equipe, cronograma_folha, tabela_simples_mensal,
+    aliquota_do_mes
+)
+
+# Parâmetros das combinações: nome no JSON -> (argumento de gerar_dados_geneticos, tipo, mínimo, máximo, padrão).
+# Os limites são os mesmos dos controles da barra lateral do app.
+PARAMETROS_COMBINACAO = {
+    'valor': ('valor_alvo_total', float, 0.01, 100_000.0, None),
+    'percentual_bebidas': ('drink_pct', float, 0, 100, 20),
+    'populacao': ('pop_size', int, 20, 200, 50),
+    'geracoes': ('n_gens', int, 10, 500, 100),
+    'tipos_sanduiches': ('tam_sand', int, 1, 10, 5),
+    'tipos_bebidas': ('tam_beb', int, 1, 10, 5)
+}
+MAX_LOTE = 200
+MAX_CORPO = 1024 * 1024
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# --- VALIDAÇÃO ---
+def ler_numero(corpo, nome, tipo, minimo, maximo, padrao, casas=2):
+    # casas=None mantém o valor como veio (alíquotas como 0.278 não podem virar 0.28)
+    valor = corpo.get(nome, padrao)
+    if valor is None:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"'{nome}' é obrigatório")
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or (tipo is int and valor != int(valor)):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"'{nome}' deve ser {'inteiro' if tipo is int else 'numérico'}")
+    if not minimo <= valor <= maximo:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"'{nome}' deve estar entre {minimo} e {maximo}")
+    if tipo is int:
+        return int(valor)
+    return float(valor) if casas is None else round(float(valor), casas)
+
+def parametros_combinacao(corpo, valor=None):
+    """Argumentos de `gerar_dados_geneticos` a partir do JSON; `valor` substitui o do corpo nos lotes."""
+    if valor is not None:
+        corpo = {**corpo, 'valor': valor}
+    return {argumento: ler_numero(corpo, nome, *limites) for nome, (argumento, *limites) in PARAMETROS_COMBINACAO.items()}
+
+def chave_calculo(parametros):
+    return hashlib.sha1(json.dumps(parametros, sort_keys=True).encode()).hexdigest()[:12]
+
+
+# --- CÁLCULOS DAS COMBINAÇÕES (POOL DE PROCESSOS COM COALESCÊNCIA) ---
+def novo_estado(processos, max_pendentes, recebimentos, equipe):
+    # "spawn": o algoritmo genético roda fora do processo do servidor, sem herdar o laço de eventos
+    contexto = multiprocessing.get_context("spawn")
+    return {
+        'executor': ProcessPoolExecutor(max_workers=processos, mp_context=contexto),
+        'processos': processos,
+        'max_pendentes': max_pendentes,
+        'em_andamento': {},  # chave dos parâmetros -> futuro compartilhado pelas requisições idênticas
+        'arquivos': {'recebimentos': recebimentos, 'equipe': equipe},
+        'contadores': {'requisicoes': 0, 'calculos': 0, 'coalescidas': 0, 'rejeitadas': 0, 'erros': 0},
+        'inicio': time.time()
+    }
+
+def reservar_vagas(estado, chaves):
+    """Recusa a requisição inteira se os cálculos novos não couberem na fila (as chaves já em andamento não contam)."""
+    novas = {c for c in chaves if c not in estado['em_andamento']}
+    if len(estado['em_andamento']) + len(novas) > estado['max_pendentes']:
+        estado['contadores']['rejeitadas'] += 1
+        raise ErroRequisicao(HTTPStatus.SERVICE_UNAVAILABLE,
+                             f"Fila cheia ({len(estado['em_andamento'])} cálculos em andamento); tente novamente")
+
+async def calcular(estado, parametros, chave):
+    """Resultado do cálculo; requisições idênticas chegando durante a execução aguardam o mesmo futuro."""
+    futuro = estado['em_andamento'].get(chave)
+    coalescida = futuro is not None
+    if coalescida:
+        estado['contadores']['coalescidas'] += 1
+    else:
+        loop = asyncio.get_running_loop()
+        futuro = loop.run_in_executor(estado['executor'], partial(gerar_dados_geneticos, **parametros))
+        estado['em_andamento'][chave] = futuro
+        estado['contadores']['calculos'] += 1
+        futuro.add_done_callback(lambda _: estado['em_andamento'].pop(chave, None))
+    # shield: um cliente que desconecta não cancela o cálculo das demais requisições à espera dele
+    resultado = await asyncio.shield(futuro)
+    return {**resultado, 'coalescida': coalescida}
+
+
+# --- RESUMO FINANCEIRO ---
+def caminho_e_versao(caminho):
+    return caminho, os.path.getmtime(caminho) if os.path.exists(caminho) else None
+
+@lru_cache(maxsize=2)
+def recebimentos_em_disco(caminho, modificado_em):
+    return ler_recebimentos(caminho)
+
+@lru_cache(maxsize=2)
+def equipe_em_disco(caminho, modificado_em):
+    return ler_equipe(caminho)
+
+# Fora do servidor do Streamlit o st.cache_data não guarda nada: o que só depende das planilhas
+# e do mês fica em memória aqui, invalidado pela data de modificação dos arquivos
+@lru_cache(maxsize=64)
+def historico_simples(caminho, modificado_em, mes):
+    return tabela_simples_mensal(recebimentos_em_disco(caminho, modificado_em), mes)
+
+@lru_cache(maxsize=64)
+def folha_do_mes(caminho, modificado_em, mes, aliquota_inss):
+    return float(cronograma_folha(equipe_em_disco(caminho, modificado_em), mes, mes, aliquota_inss)['Total'].sum())
+
+def resumo_financeiro(corpo, arquivos):
+    """Mesmo cálculo da aba de resumo de vendas, a partir dos totais por forma de pagamento informados pelo PDV."""
+    vendas = corpo.get('vendas')
+    if not isinstance(vendas, dict) or not vendas:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "'vendas' deve ser um objeto {forma de pagamento: valor}")
+    transacoes = corpo.get('transacoes') or {}
+    if not isinstance(transacoes, dict):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "'transacoes' deve ser um objeto {forma de pagamento: quantidade}")
+    desconhecidas = sorted(set(vendas) - set(TAXAS_ADQUIRENTE) - {'Dinheiro'})
+    if desconhecidas:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Formas de pagamento desconhecidas: {', '.join(desconhecidas)}")
+    try:
+        mes = pd.Period(corpo['mes'], 'M') if corpo.get('mes') else pd.Timestamp.today().to_period('M')
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "'mes' deve estar no formato AAAA-MM")
+    custo_contadora = ler_numero(corpo, 'custo_contadora', float, 0, 1_000_000, 316.0)
+    aliquota_inss = ler_numero(corpo, 'aliquota_inss', float, 0, 1, 0.0, casas=None)
+    if aliquota_inss not in OPCOES_INSS_PATRONAL.values():
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST,
+                             f"'aliquota_inss' deve ser uma de {sorted(OPCOES_INSS_PATRONAL.values())}")
+
+    linhas = []
+    for forma in vendas:
+        valor = ler_numero(vendas, forma, float, 0, 100_000_000, None)
+        n = ler_numero(transacoes, forma, int, 0, 10_000_000, 0)
+        taxa = TAXAS_ADQUIRENTE.get(forma, {'percentual': 0.0, 'fixa': 0.0})
+        valor_taxa = round(valor * taxa['percentual'] / 100 + n * taxa['fixa'], 2)
+        linhas.append({'forma': forma, 'valor': valor, 'taxa': valor_taxa, 'liquido': round(valor - valor_taxa, 2)})
+
+    total_vendas = sum(linha['valor'] for linha in linhas)
+    taxas_adquirente = sum(linha['taxa'] for linha in linhas)
+    recebimentos = caminho_e_versao(arquivos['recebimentos'])
+    aliquota_simples = aliquota_do_mes(recebimentos_em_disco(*recebimentos), mes, total_vendas,
+                                       historico=historico_simples(*recebimentos, mes))
+    imposto_simples = total_vendas * aliquota_simples
+    custo_funcionarios = folha_do_mes(*caminho_e_versao(arquivos['equipe']), mes, aliquota_inss)
+    total_custos = imposto_simples + custo_funcionarios + custo_contadora + taxas_adquirente
+    return {
+        'mes': str(mes),
+        'faturamento': round(total_vendas, 2),
+        'taxas_adquirente': round(taxas_adquirente, 2),
+        'receita_liquida': round(total_vendas - taxas_adquirente, 2),
+        'aliquota_simples': round(aliquota_simples, 6),
+        'imposto_simples': round(imposto_simples, 2),
+        'custo_funcionarios': round(custo_funcionarios, 2),
+        'custo_contadora': custo_contadora,
+        'total_custos': round(total_custos, 2),
+        'lucro_estimado': round(total_vendas - total_custos, 2),
+        'vendas': linhas
+    }
+
+
+# --- ROTAS ---
+async def rota_saude(estado, corpo):
+    return {
+        'status': 'ok',
+        'processos': estado['processos'],
+        'max_pendentes': estado['max_pendentes'],
+        'em_andamento': len(estado['em_andamento']),
+        'ativo_ha': round(time.time() - estado['inicio'], 1),
+        **estado['contadores']
+    }
+
+async def rota_combinacao(estado, corpo):
+    parametros = parametros_combinacao(corpo)
+    chave = chave_calculo(parametros)
+    reservar_vagas(estado, [chave])
+    return await calcular(estado, parametros, chave)
+
+async def rota_combinacoes(estado, corpo):
+    valores = corpo.get('valores')
+    if not isinstance(valores, list) or not 0 < len(valores) <= MAX_LOTE:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"'valores' deve ser uma lista com 1 a {MAX_LOTE} valores")
+    lote = [parametros_combinacao(corpo, valor) for valor in valores]
+    chaves = [chave_calculo(parametros) for parametros in lote]
+    reservar_vagas(estado, chaves)
+    resultados = await asyncio.gather(*(calcular(estado, p, c) for p, c in zip(lote, chaves)))
+    return {'resultados': resultados}
+
+async def rota_resumo_financeiro(estado, corpo):
+    # pandas fora do laço de eventos: as outras conexões continuam sendo atendidas
+    return await asyncio.get_running_loop().run_in_executor(None, resumo_financeiro, corpo, estado['arquivos'])
+
+ROTAS = {
+    '/saude': ('GET', rota_saude),
+    '/combinacao': ('POST', rota_combinacao),
+    '/combinacoes': ('POST', rota_combinacoes),
+    '/resumo-financeiro': ('POST', rota_resumo_financeiro)
+}
+
+
+# --- SERVIDOR HTTP/1.1 ---
+async def despachar(estado, metodo, caminho, corpo):
+    estado['contadores']['requisicoes'] += 1
+    try:
+        rota = ROTAS.get(caminho.split('?', 1)[0])
+        if rota is None:
+            raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Rota desconhecida: {caminho}")
+        metodo_rota, funcao = rota
+        if metodo != metodo_rota:
+            raise ErroRequisicao(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {metodo_rota} em {caminho}")
+        try:
+            dados = json.loads(corpo) if corpo else {}
+        except ValueError:
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Corpo da requisição não é um JSON válido")
+        if not isinstance(dados, dict):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "O corpo da requisição deve ser um objeto JSON")
+        return HTTPStatus.OK, await funcao(estado, dados)
+    except ErroRequisicao as e:
+        return e.status, {'erro': str(e)}
+    except Exception as e:
+        estado['contadores']['erros'] += 1
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {'erro': f"{type(e).__name__}: {e}"}
+
+def resposta_http(status, dados, manter_conexao):
+    corpo = json.dumps(dados, ensure_ascii=False).encode()
+    cabecalhos = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(corpo)}",
+        f"Connection: {'keep-alive' if manter_conexao else 'close'}"
+    ]
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        cabecalhos.append("Retry-After: 1")
+    return ("\r\n".join(cabecalhos) + "\r\n\r\n").encode() + corpo
+
+async def atender(estado, reader, writer):
+    """Uma conexão: requisições em sequência enquanto o cliente mantiver o keep-alive."""
+    try:
+        while True:
+            linha = await reader.readline()
+            if not linha:
+                break
+            partes = linha.decode('latin-1').split()
+            if len(partes) != 3:
+                writer.write(resposta_http(HTTPStatus.BAD_REQUEST, {'erro': "Linha de requisição inválida"}, False))
+                break
+            metodo, caminho, versao = partes
+            cabecalhos = {}
+            while (linha := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                nome, _, valor = linha.decode('latin-1').partition(':')
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            manter_conexao = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+
+            if 'transfer-encoding' in cabecalhos:
+                writer.write(resposta_http(HTTPStatus.LENGTH_REQUIRED, {'erro': "Envie o corpo com Content-Length"}, False))
+                break
+            tamanho = int(cabecalhos.get('content-length', 0) or 0)
+            if tamanho > MAX_CORPO:
+                writer.write(resposta_http(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                           {'erro': f"Corpo maior que {MAX_CORPO} bytes"}, False))
+                break
+            corpo = await reader.readexactly(tamanho) if tamanho else b''
+
+            status, dados = await despachar(estado, metodo, caminho, corpo)
+            writer.write(resposta_http(status, dados, manter_conexao))
+            await writer.drain()
+            if not manter_conexao:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def servir(host, porta, estado):
+    servidor = await asyncio.start_server(partial(atender, estado), host, porta)
+    print(f"API em http://{host}:{porta} ({estado['processos']} processo(s), até {estado['max_pendentes']} cálculos na fila)")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    from streamlit.logger import set_log_level
+
+    parser = argparse.ArgumentParser(description="API HTTP local das combinações e dos cálculos financeiros.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--processos", type=int, help="processos do algoritmo genético (padrão: núcleos disponíveis)")
+    parser.add_argument("--max-pendentes", type=int, default=64,
+                        help="cálculos distintos em andamento antes de responder 503")
+    parser.add_argument("--recebimentos", default="recebimentos.xlsx")
+    parser.add_argument("--equipe", default="funcionarios.xlsx")
+    args = parser.parse_args()
+    set_log_level("error")  # sem o servidor do Streamlit os caches avisam a cada chamada
+
+    estado = novo_estado(args.processos or os.cpu_count() or 1, args.max_pendentes, args.recebimentos, args.equipe)
+    try:
+        asyncio.run(servir(args.host, args.porta, estado))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        estado['executor'].shutdown(cancel_futures=True)
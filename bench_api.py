@@ -0,0 +1,121 @@
+"""Teste de carga da API local (api.py): vazão e latência de cauda por rota.
+
+Uso: python bench_api.py [--url http://127.0.0.1:8765] [--requisicoes 200] [--concorrencia 20]
+                         [--rota combinacao|combinacoes|resumo-financeiro] [--valores-distintos 10] [--lote 10]
+
+Com poucos valores distintos e muita concorrência as requisições idênticas se sobrepõem na API
+e são coalescidas; o contador da rota /saude mostra quantas foram atendidas assim.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def valores_de_teste(quantidade, semente=0):
+    # Múltiplos de R$ 0,50, como os totais do cardápio
+    gerador = random.Random(semente)
+    return [gerador.randrange(40, 600) / 2 for _ in range(quantidade)]
+
+
+def corpo_da_rota(rota, valores, gerador, lote):
+    if rota == 'combinacao':
+        return {'valor': gerador.choice(valores)}
+    if rota == 'combinacoes':
+        return {'valores': [gerador.choice(valores) for _ in range(lote)]}
+    return {
+        'vendas': {'Crédito Visa': gerador.choice(valores) * 10, 'Débito Elo': gerador.choice(valores) * 5,
+                   'PIX': gerador.choice(valores) * 8, 'Dinheiro': gerador.choice(valores) * 3},
+        'mes': "2025-06"
+    }
+
+
+async def requisitar(reader, writer, host, metodo, caminho, dados=None):
+    corpo = json.dumps(dados).encode() if dados is not None else b''
+    writer.write((f"{metodo} {caminho} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    tamanho = 0
+    while (linha := await reader.readline()) not in (b'\r\n', b''):
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        if nome.strip().lower() == 'content-length':
+            tamanho = int(valor)
+    return status, json.loads(await reader.readexactly(tamanho)) if tamanho else None
+
+
+async def cliente(endereco, fila, rota, valores, lote, latencias, status, semente):
+    # Cada cliente mantém uma conexão keep-alive e consome requisições da fila compartilhada
+    gerador = random.Random(semente)
+    reader, writer = await asyncio.open_connection(*endereco)
+    try:
+        while True:
+            try:
+                fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            inicio = time.perf_counter()
+            codigo, _ = await requisitar(reader, writer, endereco[0], 'POST', f"/{rota}",
+                                         corpo_da_rota(rota, valores, gerador, lote))
+            latencias.append(time.perf_counter() - inicio)
+            status[codigo] += 1
+    finally:
+        writer.close()
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def medir(url, rota, requisicoes, concorrencia, valores_distintos, lote):
+    partes = urlsplit(url)
+    endereco = (partes.hostname, partes.port or 80)
+    valores = valores_de_teste(valores_distintos)
+    fila = asyncio.Queue()
+    for i in range(requisicoes):
+        fila.put_nowait(i)
+
+    reader, writer = await asyncio.open_connection(*endereco)
+    _, antes = await requisitar(reader, writer, endereco[0], 'GET', "/saude")
+
+    latencias, status = [], Counter()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(endereco, fila, rota, valores, lote, latencias, status, semente)
+                           for semente in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    _, depois = await requisitar(reader, writer, endereco[0], 'GET', "/saude")
+    writer.close()
+    latencias.sort()
+    return {
+        'duracao': duracao,
+        'vazao': len(latencias) / duracao,
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95),
+        'p99': percentil(latencias, 99),
+        'max': latencias[-1],
+        'status': dict(status),
+        'calculos': depois['calculos'] - antes['calculos'],
+        'coalescidas': depois['coalescidas'] - antes['coalescidas']
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API local.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--rota", default="combinacao", choices=["combinacao", "combinacoes", "resumo-financeiro"])
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--valores-distintos", type=int, default=10,
+                        help="quantos valores diferentes sortear (menos valores -> mais coalescência)")
+    parser.add_argument("--lote", type=int, default=10, help="valores por requisição na rota combinacoes")
+    args = parser.parse_args()
+
+    r = asyncio.run(medir(args.url, args.rota, args.requisicoes, args.concorrencia, args.valores_distintos, args.lote))
+    print(f"/{args.rota}: {args.requisicoes} requisições, {args.concorrencia} conexões em {r['duracao']:.2f}s")
+    print(f"vazão {r['vazao']:8.1f} req/s | p50 {r['p50'] * 1000:8.1f} ms | p95 {r['p95'] * 1000:8.1f} ms | "
+          f"p99 {r['p99'] * 1000:8.1f} ms | máx {r['max'] * 1000:8.1f} ms")
+    print(f"status {r['status']} | cálculos executados {r['calculos']} | coalescidas {r['coalescidas']}")
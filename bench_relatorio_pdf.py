@@ -0,0 +1,52 @@
+"""Compara a geração do relatório PDF com gráficos raster (PNG 300 dpi) e vetoriais.
+
+Uso: python bench_relatorio_pdf.py [repetições]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from relatorio_pdf import create_pdf_report, png_vendas, png_custos
+
+VENDAS = pd.DataFrame({
+    'Forma': ['Crédito Elo', 'Crédito MasterCard', 'Crédito Visa', 'Débito Elo',
+              'Débito MasterCard', 'Débito Visa', 'PIX'],
+    'Valor': [4250.0, 6120.5, 7340.0, 1890.0, 3210.0, 4015.5, 8930.0]
+})
+
+
+def gerar(graficos_vetoriais, cache_graficos=False):
+    if not cache_graficos:
+        png_vendas.cache_clear()
+        png_custos.cache_clear()
+    total = VENDAS['Valor'].sum()
+    imposto = total * 0.06
+    custos = imposto + 1518.0 * 1.3 + 316.0 + total * 0.025
+    buffer = create_pdf_report(
+        pd.DataFrame(), VENDAS, total, imposto, 1518.0 * 1.3, 316.0, custos, total - custos,
+        "logo.png", taxas_adquirente=total * 0.025, graficos_vetoriais=graficos_vetoriais
+    )
+    return len(buffer.getvalue())
+
+
+def medir(graficos_vetoriais, repeticoes, cache_graficos=False):
+    gerar(graficos_vetoriais, cache_graficos)  # aquece imports e fontes
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanho = gerar(graficos_vetoriais, cache_graficos)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos), tamanho
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    resultados = {}
+    for nome, vetorial, cache in (("raster (PNG 300 dpi)", False, False), ("raster (PNG em cache)", False, True),
+                                  ("vetorial", True, False)):
+        resultados[nome] = medir(vetorial, repeticoes, cache)
+        melhor, media, tamanho = resultados[nome]
+        print(f"{nome:<22} melhor {melhor * 1000:8.1f} ms | média {media * 1000:8.1f} ms | {tamanho / 1024:8.1f} KiB")
+    (r_melhor, _, r_tam), _, (v_melhor, _, v_tam) = resultados.values()
+    print(f"speedup {r_melhor / v_melhor:.1f}x | tamanho {v_tam / r_tam:.1%} do original")
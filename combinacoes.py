@@ -0,0 +1,202 @@
+import random
+import time
+from types import SimpleNamespace
+
+# --- CARDÁPIOS ---
+CARDAPIOS = {
+    "sanduiches": {
+        "X Salada Simples": 18.00,
+        "X Salada Especial": 20.00,
+        "X Bacon Especial": 24.00,
+        "X Hamburgão": 35.00,
+        "X Mata-Fome": 39.00,
+        "X Frango Simples": 22.00,
+        "X Frango Especial": 24.00,
+        "X Frango Bacon": 27.00,
+        "X Frango Tudo": 30.00,
+        "X Lombo Simples": 23.00,
+        "X Lombo Especial": 26.00,
+        "X Lombo Bacon": 28.00,
+        "X Lombo Tudo": 31.00,
+        "X Filé Simples": 28.00,
+        "X Filé Especial": 30.00,
+        "X Filé Bacon": 33.00,
+        "X Filé Tudo": 36.00
+    },
+    "bebidas": {
+        "Suco": 10.00,
+        "Creme": 15.00,
+        "Refri caçula": 3.50,
+        "Refri Lata": 7.00,
+        "Refri 600": 8.00,
+        "Refri 1L": 10.00,
+        "Refri 2L": 15.00,
+        "Água": 3.00,
+        "Água com Gas": 4.00
+    }
+}
+
+# --- FUNÇÕES DE COMBINAÇÃO ---
+def round_to_50_or_00(value):
+    return int(round(value))
+
+def calculate_combination_value(combination, item_prices):
+    return sum(item_prices.get(name, 0) * quantity for name, quantity in combination.items())
+
+# --- FUNÇÕES PARA ALGORITMO GENÉTICO ---
+def create_individual(item_prices, combination_size):
+    if not item_prices: return {}
+    items = list(item_prices.keys())
+    size = min(combination_size, len(items))
+    selected_items = random.sample(items, size)
+    return {name: int(random.randint(1, 100)) for name in selected_items}
+
+def evaluate_fitness(individual, item_prices, target_value):
+    total = calculate_combination_value(individual, item_prices)
+    if total > target_value: return 1_000_000 + (total - target_value)
+    score = target_value - total
+    if total > 0:
+        limite_concentracao = total * 0.50
+        for item, qty in individual.items():
+            valor_item = item_prices.get(item, 0) * qty
+            if valor_item > limite_concentracao:
+                score += 5000 + (valor_item - limite_concentracao)
+    return score
+
+def crossover(parent1, parent2):
+    all_keys = set(list(parent1.keys()) + list(parent2.keys()))
+    child = {}
+    for key in all_keys:
+        if key in parent1 and key in parent2:
+            child[key] = parent1[key] if random.random() < 0.5 else parent2[key]
+        elif key in parent1:
+            if random.random() < 0.5: child[key] = parent1[key]
+        elif key in parent2:
+            if random.random() < 0.5: child[key] = parent2[key]
+    return child
+
+def mutate(individual, item_prices, mutation_rate=0.2, max_items=5):
+    new_individual = individual.copy()
+    if (random.random() < mutation_rate and len(new_individual) < max_items and len(new_individual) < len(item_prices)):
+        possible_new_items = [item for item in item_prices.keys() if item not in new_individual]
+        if possible_new_items:
+            new_item = random.choice(possible_new_items)
+            new_individual[new_item] = 1
+    if random.random() < mutation_rate and len(new_individual) > 1:
+        item_to_remove = random.choice(list(new_individual.keys()))
+        del new_individual[item_to_remove]
+    for key in list(new_individual.keys()):
+        if random.random() < mutation_rate:
+            change = random.choice([-1, 1]) 
+            new_value = max(1, int(new_individual[key] + change))
+            new_individual[key] = new_value
+    return new_individual
+
+def genetic_algorithm(item_prices, target_value, population_size=50, generations=100, combination_size=5, elite_size=5, tournament_size=3,
+                      parar=None, ao_geracao=None):
+    if not item_prices or target_value <= 0: return {}
+    population = [create_individual(item_prices, combination_size) for _ in range(population_size)]
+    best_individual = {}
+    best_fitness = float('inf')
+    
+    for generation in range(generations):
+        if parar is not None and parar.is_set(): break
+        fitness_scores = [(individual, evaluate_fitness(individual, item_prices, target_value)) for individual in population]
+        fitness_scores.sort(key=lambda x: x[1])
+        if fitness_scores[0][1] < best_fitness:
+            best_individual = fitness_scores[0][0].copy()
+            best_fitness = fitness_scores[0][1]
+        if ao_geracao: ao_geracao(generation, best_individual, best_fitness)
+        if best_fitness == 0: break
+        
+        next_generation = [ind[0].copy() for ind in fitness_scores[:elite_size]]
+        while len(next_generation) < population_size:
+            tournament = random.sample(fitness_scores, tournament_size)
+            tournament.sort(key=lambda x: x[1])
+            parent1 = tournament[0][0]
+            parent2 = random.choice(fitness_scores[:10])[0]
+            child = crossover(parent1, parent2)
+            child = mutate(child, item_prices, max_items=combination_size)
+            next_generation.append(child)
+        population = next_generation
+    
+    final_combination = {k: int(v) for k, v in best_individual.items() if v > 0}
+    final_total = calculate_combination_value(final_combination, item_prices)
+    while final_total > target_value and len(final_combination) > 0:
+        item_to_reduce = random.choice(list(final_combination.keys()))
+        if final_combination[item_to_reduce] <= 1: del final_combination[item_to_reduce]
+        else: final_combination[item_to_reduce] -= 1
+        final_total = calculate_combination_value(final_combination, item_prices)
+    return final_combination
+
+def buscar_combinacao_exata(item_prices, target_value, max_time_seconds=5, population_size=100, generations=200, combination_size=10,
+                            parar=None, ao_progredir=None):
+    start_time = time.time()
+    best_global_individual = {}
+    best_global_diff = float('inf') 
+    attempts = 0
+    geracoes = 0
+
+    def a_cada_geracao(_, individuo, aptidao):
+        # ao_progredir(segundos decorridos, gerações somadas entre tentativas, resíduo, melhor combinação)
+        nonlocal geracoes
+        geracoes += 1
+        melhor = individuo if aptidao < best_global_diff else best_global_individual
+        ao_progredir(time.time() - start_time, geracoes, target_value - calculate_combination_value(melhor, item_prices), melhor)
+
+    while (time.time() - start_time) < max_time_seconds and not (parar is not None and parar.is_set()):
+        attempts += 1
+        current_result = genetic_algorithm(item_prices, target_value, population_size, generations, combination_size, parar=parar,
+                                           ao_geracao=a_cada_geracao if ao_progredir else None)
+        current_fitness = evaluate_fitness(current_result, item_prices, target_value)
+        if current_fitness == 0: return current_result, attempts
+        if current_fitness < best_global_diff:
+            best_global_diff = current_fitness
+            best_global_individual = current_result
+    return best_global_individual, attempts
+
+# --- LÓGICA DE PROCESSAMENTO GENÉTICO (SEPARADA) ---
+# Busca curta das bebidas quando o usuário aceita o melhor atual ainda na etapa dos sanduíches
+SEGUNDOS_COMPLEMENTO_BEBIDAS = 1
+
+def gerar_dados_geneticos(valor_alvo_total, drink_pct, pop_size, n_gens, tam_sand, tam_beb, parar=None, ao_progredir=None,
+                          aceitar=None):
+    # ao_progredir(etapa, fração concluída, geração, resíduo da etapa, {'sanduiches': ..., 'bebidas': ...}) a cada geração,
+    # sempre com a melhor combinação encontrada até o momento.
+    # parar cancela o cálculo; aceitar só encerra a busca da etapa atual, e as bebidas ainda completam o alvo.
+    avisar = ao_progredir or (lambda etapa, fracao, geracao, residuo, parcial: None)
+    parar_etapa = SimpleNamespace(is_set=lambda: any(e is not None and e.is_set() for e in (parar, aceitar)))
+    target_sanduiches_inicial = valor_alvo_total * (1 - drink_pct/100)
+    
+    combinacao_sanduiches, t_sand = buscar_combinacao_exata(
+        CARDAPIOS["sanduiches"], target_sanduiches_inicial, max_time_seconds=5, 
+        population_size=pop_size, generations=n_gens, combination_size=tam_sand, parar=parar_etapa,
+        ao_progredir=lambda decorrido, geracao, residuo, melhor: avisar(
+            "Sanduíches", min(decorrido / 5, 1.0) / 2, geracao, residuo, {'sanduiches': melhor, 'bebidas': {}})
+    )
+    valor_real_sanduiches = calculate_combination_value(combinacao_sanduiches, CARDAPIOS["sanduiches"])
+    
+    target_bebidas_corrigido = valor_alvo_total - valor_real_sanduiches
+    aceito_antes = parar_etapa.is_set()
+    
+    combinacao_bebidas, t_beb = buscar_combinacao_exata(
+        CARDAPIOS["bebidas"], target_bebidas_corrigido,
+        max_time_seconds=SEGUNDOS_COMPLEMENTO_BEBIDAS if aceito_antes else 5,
+        population_size=pop_size, generations=n_gens, combination_size=tam_beb,
+        parar=parar if aceito_antes else parar_etapa,
+        ao_progredir=lambda decorrido, geracao, residuo, melhor: avisar(
+            "Bebidas", 0.5 + min(decorrido / 5, 1.0) / 2, geracao, residuo, {'sanduiches': combinacao_sanduiches, 'bebidas': melhor})
+    )
+    
+    valor_real_bebidas = calculate_combination_value(combinacao_bebidas, CARDAPIOS["bebidas"])
+    valor_real_total = valor_real_sanduiches + valor_real_bebidas
+    
+    return {
+        'sanduiches': combinacao_sanduiches,
+        'bebidas': combinacao_bebidas,
+        'val_sand': valor_real_sanduiches,
+        'val_beb': valor_real_bebidas,
+        'val_total': valor_real_total,
+        'alvo': valor_alvo_total,
+        'ciclos': t_sand + t_beb
+    }
@@ -0,0 +1,130 @@
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# --- EXPORTAÇÃO EM EXCEL (XLSXWRITER, MEMÓRIA CONSTANTE) ---
+# Formatos nativos do Excel por tipo de coluna: o valor fica numérico/data na planilha
+FORMATOS_EXCEL = {
+    'data': 'dd/mm/yyyy',
+    'data_hora': 'dd/mm/yyyy hh:mm',
+    'mes': 'mm/yyyy',
+    'moeda': '"R$" #,##0.00',
+    'inteiro': '#,##0',
+    'percentual': '0.00%',
+    'texto': '@'
+}
+# Linhas convertidas para objetos Python de cada vez; só um bloco existe em memória durante a escrita
+LINHAS_POR_BLOCO = 10_000
+
+
+def valores_da_coluna(serie, tipo):
+    """Valores prontos para o xlsxwriter (datas como datetime, números como float), com None nos vazios."""
+    if tipo == 'mes':
+        serie = serie.dt.to_timestamp() if isinstance(serie.dtype, pd.PeriodDtype) else pd.to_datetime(serie)
+    if tipo in ('data', 'data_hora', 'mes'):
+        datas = pd.to_datetime(serie)
+        return [None if pd.isna(d) else d.to_pydatetime() for d in datas]
+    if tipo == 'texto':
+        return [None if pd.isna(v) else str(v) for v in serie.to_numpy(dtype=object)]
+    numeros = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+    return [None if np.isnan(v) else v for v in numeros.tolist()]
+
+
+def escrever_aba(workbook, nome, df, tipos, formatos, formato_cabecalho, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Escreve uma aba linha a linha; no modo constant_memory cada linha é descarregada ao passar para a próxima.
+
+    Os valores são convertidos em blocos de `linhas_por_bloco` linhas, para a memória não crescer com a aba.
+    """
+    worksheet = workbook.add_worksheet(nome)
+    colunas = list(tipos)
+    escritores = {
+        'data': worksheet.write_datetime, 'data_hora': worksheet.write_datetime, 'mes': worksheet.write_datetime,
+        'texto': worksheet.write_string
+    }
+    for j, coluna in enumerate(colunas):
+        largura = max(len(coluna), 12 if tipos[coluna] != 'texto' else 20) + 2
+        worksheet.set_column(j, j, largura, formatos[tipos[coluna]])
+    worksheet.write_row(0, 0, colunas, formato_cabecalho)
+    worksheet.freeze_panes(1, 0)
+
+    metodos = [(j, escritores.get(tipos[c], worksheet.write_number), formatos[tipos[c]]) for j, c in enumerate(colunas)]
+    for inicio in range(0, len(df), linhas_por_bloco):
+        trecho = df.iloc[inicio:inicio + linhas_por_bloco]
+        dados = [valores_da_coluna(trecho[coluna], tipos[coluna]) for coluna in colunas]
+        for i, linha in enumerate(zip(*dados), start=inicio + 1):
+            for (j, escrever, formato), valor in zip(metodos, linha):
+                if valor is not None:
+                    escrever(i, j, valor, formato)
+    if len(df):
+        worksheet.autofilter(0, 0, len(df), len(colunas) - 1)
+    return worksheet
+
+
+def resumo_mensal(recebimentos):
+    if recebimentos.empty:
+        return pd.DataFrame(columns=['Mês', 'Dinheiro', 'Cartão', 'PIX', 'Faturamento', 'Dias com Movimento', 'Média Diária'])
+    valores = recebimentos[['Dinheiro', 'Cartao', 'Pix']].fillna(0.0)
+    meses = pd.to_datetime(recebimentos['Data']).dt.to_period('M').rename('Mês')
+    mensal = valores.groupby(meses).sum().rename(columns={'Cartao': 'Cartão', 'Pix': 'PIX'})
+    mensal['Faturamento'] = mensal.sum(axis=1)
+    mensal['Dias com Movimento'] = valores.sum(axis=1).gt(0).groupby(meses).sum()
+    mensal['Média Diária'] = mensal['Faturamento'] / mensal['Dias com Movimento'].where(mensal['Dias com Movimento'] > 0)
+    return mensal.reset_index()
+
+
+def exportar_planilha(destino, recebimentos, transacoes=None, combinacoes=None):
+    """Gera o .xlsx em `destino` com recebimentos diários, resumo mensal, totais por forma e combinações.
+
+    As abas opcionais só entram quando há dados. Retorna a lista de abas escritas.
+    """
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True, 'strings_to_numbers': False})
+    formatos = {tipo: workbook.add_format({'num_format': fmt}) for tipo, fmt in FORMATOS_EXCEL.items()}
+    cabecalho = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#262730', 'align': 'center'})
+    abas = []
+
+    diario = recebimentos.sort_values('Data').rename(columns={'Cartao': 'Cartão', 'Pix': 'PIX'})
+    diario = diario.assign(Total=diario[['Dinheiro', 'Cartão', 'PIX']].fillna(0.0).sum(axis=1))
+    escrever_aba(workbook, "Recebimentos", diario,
+                 {'Data': 'data', 'Dinheiro': 'moeda', 'Cartão': 'moeda', 'PIX': 'moeda', 'Total': 'moeda'},
+                 formatos, cabecalho)
+    abas.append("Recebimentos")
+
+    escrever_aba(workbook, "Mensal", resumo_mensal(recebimentos),
+                 {'Mês': 'mes', 'Dinheiro': 'moeda', 'Cartão': 'moeda', 'PIX': 'moeda', 'Faturamento': 'moeda',
+                  'Dias com Movimento': 'inteiro', 'Média Diária': 'moeda'}, formatos, cabecalho)
+    abas.append("Mensal")
+
+    if transacoes is not None and not transacoes.empty:
+        agregacoes = {'Transações': ('Valor', 'size'), 'Valor': ('Valor', 'sum')}
+        tipos = {'Forma': 'texto', 'Transações': 'inteiro', 'Valor': 'moeda'}
+        for coluna, titulo in [('Taxa', 'Taxa'), ('Liquido', 'Líquido')]:
+            if coluna in transacoes.columns:
+                agregacoes[titulo] = (coluna, 'sum')
+                tipos[titulo] = 'moeda'
+        por_forma = transacoes.groupby('Forma').agg(**agregacoes).reset_index()
+        por_forma['Participação'] = por_forma['Valor'] / por_forma['Valor'].sum()
+        tipos['Participação'] = 'percentual'
+        escrever_aba(workbook, "Por Forma", por_forma.sort_values('Valor', ascending=False), tipos, formatos, cabecalho)
+        abas.append("Por Forma")
+
+    if combinacoes is not None and not combinacoes.empty:
+        escrever_aba(workbook, "Combinações", combinacoes,
+                     {'Origem': 'texto', 'Categoria': 'texto', 'Produto': 'texto', 'Quantidade': 'inteiro',
+                      'Preço Unitário': 'moeda', 'Subtotal': 'moeda'}, formatos, cabecalho)
+        abas.append("Combinações")
+
+    workbook.close()
+    return abas
+
+
+def planilha_em_bytes(*args, **kwargs):
+    """Mesma exportação, devolvendo o conteúdo do arquivo (o modo constant_memory exige um arquivo em disco)."""
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, f"clips_burger_{datetime.now():%Y%m%d}.xlsx")
+        exportar_planilha(caminho, *args, **kwargs)
+        with open(caminho, 'rb') as f:
+            return f.read()
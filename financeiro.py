@@ -0,0 +1,262 @@
+import os
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- CONSTANTES FINANCEIRAS ---
+# Taxas da adquirente (MDR) por forma de pagamento: percentual sobre a venda,
+# tarifa fixa por transação e prazo de liquidação em dias corridos
+TAXAS_ADQUIRENTE = {
+    'Crédito Elo': {'percentual': 3.49, 'fixa': 0.00, 'prazo_dias': 30},
+    'Crédito MasterCard': {'percentual': 3.19, 'fixa': 0.00, 'prazo_dias': 30},
+    'Crédito Visa': {'percentual': 3.19, 'fixa': 0.00, 'prazo_dias': 30},
+    'Crédito Amex': {'percentual': 3.99, 'fixa': 0.00, 'prazo_dias': 30},
+    'Débito Elo': {'percentual': 1.99, 'fixa': 0.00, 'prazo_dias': 1},
+    'Débito MasterCard': {'percentual': 1.37, 'fixa': 0.00, 'prazo_dias': 1},
+    'Débito Visa': {'percentual': 1.37, 'fixa': 0.00, 'prazo_dias': 1},
+    'Crédito Hipercard': {'percentual': 3.49, 'fixa': 0.00, 'prazo_dias': 30},
+    'Débito Hipercard': {'percentual': 1.99, 'fixa': 0.00, 'prazo_dias': 1},
+    'Voucher': {'percentual': 6.50, 'fixa': 0.00, 'prazo_dias': 30},
+    'PIX': {'percentual': 0.99, 'fixa': 0.00, 'prazo_dias': 0}
+}
+
+PARAMETROS_FINANCEIROS = {
+    "fgts": 0.08,
+    "salario_padrao": 1518.0
+}
+
+# Contribuição patronal ao INSS sobre a folha, conforme o enquadramento da empresa
+OPCOES_INSS_PATRONAL = {
+    "Simples Nacional (incluso no DAS)": 0.0,
+    "INSS Patronal (20%)": 0.20,
+    "INSS + RAT + Terceiros (27,8%)": 0.278
+}
+
+# Simples Nacional - Anexo I: (limite da RBT12, alíquota nominal, parcela a deduzir)
+FAIXAS_SIMPLES = [
+    (180_000.00, 0.040, 0.00),
+    (360_000.00, 0.073, 5_940.00),
+    (720_000.00, 0.095, 13_860.00),
+    (1_800_000.00, 0.107, 22_500.00),
+    (3_600_000.00, 0.143, 87_300.00),
+    (4_800_000.00, 0.190, 378_000.00)
+]
+
+# Eixos da simulação de cenários: rótulo, faixa padrão (mín, máx) e se o eixo é inteiro
+EIXOS_CENARIOS = {
+    "aliquota": ("Alíquota Simples (%)", (4.0, 10.0), False),
+    "salario": ("Salário (R$)", (1300.0, 2500.0), False),
+    "funcionarios": ("Nº de Funcionários", (0, 4), True),
+    "contadora": ("Custo Contadora (R$)", (200.0, 600.0), False),
+    "fator_mdr": ("Fator sobre Taxas MDR", (0.5, 1.5), False)
+}
+
+# --- LEITURA DAS PLANILHAS ---
+COLUNAS_RECEBIMENTOS = ['Data', 'Dinheiro', 'Cartao', 'Pix']
+
+def ler_recebimentos(caminho):
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS_RECEBIMENTOS)
+    df = pd.read_excel(caminho)
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_RECEBIMENTOS)
+    df['Data'] = pd.to_datetime(df['Data'])
+    return df.sort_values('Data', ascending=False)
+
+def ler_equipe(caminho):
+    if not os.path.exists(caminho):
+        return equipe_padrao()
+    equipe = pd.read_excel(caminho)
+    equipe['Admissão'] = pd.to_datetime(equipe['Admissão'])
+    equipe['Desligamento'] = pd.to_datetime(equipe['Desligamento'])
+    return equipe
+
+# --- CÁLCULOS FINANCEIROS ---
+def custo_funcionario_clt(salario, aliquota_inss=0.0):
+    # Funciona com escalares ou arrays NumPy
+    fgts = salario * PARAMETROS_FINANCEIROS["fgts"]
+    inss = salario * aliquota_inss
+    ferias = (salario / 12) * (4/3)
+    decimo_terceiro = salario / 12
+    return salario + fgts + inss + ferias + decimo_terceiro
+
+# --- FOLHA DE PAGAMENTO ---
+def equipe_padrao():
+    return pd.DataFrame({
+        'Nome': ["Funcionário 1"],
+        'Função': ["Atendente"],
+        'Salário': [PARAMETROS_FINANCEIROS["salario_padrao"]],
+        'Admissão': [pd.Timestamp("2024-01-01")],
+        'Desligamento': [pd.NaT]
+    })
+
+@st.cache_data(show_spinner=False)
+def cronograma_folha(equipe, inicio, fim, aliquota_inss=0.0):
+    """Custo mensal provisionado de toda a equipe (matriz meses × funcionários calculada de uma vez)."""
+    meses = pd.period_range(inicio, fim, freq='M')
+    equipe = equipe.dropna(subset=['Salário', 'Admissão'])
+    inicio_mes = meses.to_timestamp(how='start').to_numpy()[:, None]
+    fim_mes = meses.to_timestamp(how='start').to_numpy()[:, None] + (meses.days_in_month.to_numpy()[:, None] - 1).astype('timedelta64[D]')
+    dias_mes = meses.days_in_month.to_numpy()[:, None]
+    admissao = pd.to_datetime(equipe['Admissão']).dt.normalize().to_numpy()[None, :]
+    desligamento = pd.to_datetime(equipe['Desligamento']).dt.normalize()\
+        .fillna(pd.Timestamp.max.normalize()).to_numpy()[None, :]
+
+    # Fração do mês trabalhada por cada funcionário (admissões e desligamentos no meio do mês são proporcionais)
+    dias_trabalhados = (np.minimum(fim_mes, desligamento) - np.maximum(inicio_mes, admissao)) / np.timedelta64(1, 'D') + 1
+    fracao = np.clip(dias_trabalhados, 0, dias_mes) / dias_mes
+    salarios = equipe['Salário'].to_numpy(dtype=float)[None, :] * fracao
+
+    componentes = {
+        'Salários': salarios,
+        'FGTS': salarios * PARAMETROS_FINANCEIROS["fgts"],
+        'INSS Patronal': salarios * aliquota_inss,
+        'Férias + 1/3': salarios / 12 * (4/3),
+        '13º Salário': salarios / 12
+    }
+    cronograma = pd.DataFrame({'Mês': meses, 'Funcionários': (fracao > 0).sum(axis=1)})
+    for nome, valores in componentes.items():
+        cronograma[nome] = valores.sum(axis=1)
+    cronograma['Total'] = cronograma[list(componentes)].sum(axis=1)
+    return cronograma
+
+def aliquota_efetiva_simples(rbt12):
+    """Faixa, alíquota nominal e efetiva do Anexo I: (RBT12 × nominal − dedução) / RBT12. Aceita arrays."""
+    rbt12 = np.asarray(rbt12, dtype=float)
+    limites = np.array([f[0] for f in FAIXAS_SIMPLES])
+    faixa = np.clip(np.searchsorted(limites, rbt12, side='left'), 0, len(FAIXAS_SIMPLES) - 1)
+    nominal = np.array([f[1] for f in FAIXAS_SIMPLES])[faixa]
+    deducao = np.array([f[2] for f in FAIXAS_SIMPLES])[faixa]
+    efetiva = np.where(rbt12 > 0, (rbt12 * nominal - deducao) / np.where(rbt12 > 0, rbt12, 1), nominal)
+    return faixa + 1, nominal, efetiva
+
+def calcular_rbt12(faturamentos):
+    """RBT12 de cada mês numa única passada, com a soma móvel dos 12 meses anteriores mantida incrementalmente."""
+    janela = deque()
+    soma = 0.0
+    rbt12 = np.empty(len(faturamentos))
+    for i, valor in enumerate(faturamentos):
+        if not janela:
+            rbt12[i] = valor * 12  # início de atividade: receita do próprio mês × 12
+        elif len(janela) < 12:
+            rbt12[i] = soma / len(janela) * 12  # média dos meses anteriores × 12
+        else:
+            rbt12[i] = soma
+        janela.append(valor)
+        soma += valor
+        if len(janela) > 12:
+            soma -= janela.popleft()
+    return rbt12
+
+def faturamento_mensal(df_receipts, ate=None):
+    if df_receipts.empty:
+        return pd.Series(dtype=float)
+    datas = pd.to_datetime(df_receipts['Data'])
+    totais = df_receipts[['Dinheiro', 'Cartao', 'Pix']].sum(axis=1)
+    mensal = totais.groupby(datas.dt.to_period('M')).sum()
+    fim = max(mensal.index.max(), ate) if ate is not None else mensal.index.max()
+    return mensal.reindex(pd.period_range(mensal.index.min(), fim, freq='M'), fill_value=0.0)
+
+@st.cache_data(show_spinner=False)
+def tabela_simples_mensal(df_receipts, ate=None):
+    """Histórico mensal do Simples Nacional (RBT12, faixa, alíquotas e imposto) calculado de uma vez."""
+    mensal = faturamento_mensal(df_receipts, ate)
+    rbt12 = calcular_rbt12(mensal.to_numpy())
+    faixa, nominal, efetiva = aliquota_efetiva_simples(rbt12)
+    return pd.DataFrame({
+        'Mês': mensal.index,
+        'Faturamento': mensal.to_numpy(),
+        'RBT12': rbt12,
+        'Faixa': faixa,
+        'Alíquota Nominal': nominal,
+        'Alíquota Efetiva': efetiva,
+        'Imposto': mensal.to_numpy() * efetiva
+    })
+
+def aliquota_do_mes(df_receipts, mes, faturamento_mes, historico=None):
+    # `historico`: tabela_simples_mensal(df_receipts, mes) já calculada por quem chama
+    historico = tabela_simples_mensal(df_receipts, mes) if historico is None else historico
+    linha = historico[historico['Mês'] == mes]
+    if linha.empty or (linha['Faturamento'].iloc[0] == 0 and len(historico) == 1):
+        # Sem histórico anterior: considera a receita do próprio período × 12
+        return float(aliquota_efetiva_simples(faturamento_mes * 12)[2])
+    return float(linha['Alíquota Efetiva'].iloc[0])
+
+@st.cache_resource
+def cache_dre():
+    # Compartilhado entre reruns: assinatura de cada mês e linhas do DRE já calculadas
+    return {'parametros': None, 'assinaturas': pd.Series(dtype='int64'), 'tabela': None, 'lock': threading.Lock()}
+
+def dre_mensal(df_receipts, equipe, aliquota_inss, custo_contadora, taxa_cartao, taxa_pix):
+    """DRE mensal a partir dos recebimentos; só recalcula os meses cujos registros (ou a janela da RBT12) mudaram."""
+    colunas = ['Dinheiro', 'Cartao', 'Pix']
+    if df_receipts.empty:
+        return pd.DataFrame(), 0
+    meses = pd.to_datetime(df_receipts['Data']).dt.to_period('M').rename('Mês')
+    assinatura_linhas = (pd.util.hash_pandas_object(df_receipts[['Data'] + colunas], index=False) % (2**31)).astype('int64')
+    mensal = df_receipts[colunas].assign(Assinatura=assinatura_linhas).groupby(meses).sum()
+    mensal = mensal.reindex(pd.period_range(mensal.index.min(), mensal.index.max(), freq='M'), fill_value=0)
+    mensal['Faturamento'] = mensal[colunas].sum(axis=1)
+
+    parametros = (int(pd.util.hash_pandas_object(equipe, index=False).sum()), aliquota_inss, custo_contadora,
+                  round(taxa_cartao, 6), round(taxa_pix, 6))
+    cache = cache_dre()
+    with cache['lock']:
+        if cache['parametros'] != parametros or cache['tabela'] is None:
+            alterados = pd.Series(True, index=mensal.index)
+        else:
+            alterados = mensal['Assinatura'].ne(cache['assinaturas'].reindex(mensal.index))
+        # Uma mudança no mês m altera a RBT12 (e o imposto) dos 12 meses seguintes
+        sujos = alterados.astype(int).rolling(13, min_periods=1).max().astype(bool)
+
+        rbt12 = pd.Series(calcular_rbt12(mensal['Faturamento'].to_numpy()), index=mensal.index)
+        novos = mensal[sujos]
+        if not novos.empty:
+            _, _, efetiva = aliquota_efetiva_simples(rbt12[sujos].to_numpy())
+            folha = cronograma_folha(equipe, novos.index.min(), novos.index.max(), aliquota_inss).set_index('Mês')
+            linhas = pd.DataFrame(index=novos.index)
+            linhas['Faturamento'] = novos['Faturamento']
+            linhas['Simples'] = novos['Faturamento'] * efetiva
+            linhas['Taxas MDR'] = novos['Cartao'] * taxa_cartao + novos['Pix'] * taxa_pix
+            linhas['Folha'] = folha['Total'].reindex(novos.index, fill_value=0.0)
+            linhas['Contadora'] = custo_contadora
+            linhas['Custos'] = linhas[['Simples', 'Taxas MDR', 'Folha', 'Contadora']].sum(axis=1)
+            linhas['Lucro'] = linhas['Faturamento'] - linhas['Custos']
+            anterior = cache['tabela'] if cache['parametros'] == parametros else None
+            tabela = linhas if anterior is None else pd.concat([anterior[~anterior.index.isin(linhas.index)], linhas])
+        else:
+            tabela = cache['tabela']
+        tabela = tabela.reindex(mensal.index)
+        cache.update(parametros=parametros, assinaturas=mensal['Assinatura'], tabela=tabela)
+
+    dre = tabela.rename_axis('Mês').reset_index()
+    dre['Margem'] = dre['Lucro'] / dre['Faturamento'].where(dre['Faturamento'] > 0)
+    return dre, int(sujos.sum())
+
+def simular_cenarios(total_vendas, taxas_percentuais, taxas_fixas, eixos, aliquota_inss=0.0):
+    """Avalia o lucro estimado para todas as combinações dos eixos numa única expressão vetorizada."""
+    aliquota, salario, funcionarios, contadora, fator_mdr = np.meshgrid(
+        *[np.asarray(eixos[nome], dtype=float) for nome in EIXOS_CENARIOS], indexing='ij', sparse=True)
+    custos = (total_vendas * aliquota / 100
+              + funcionarios * custo_funcionario_clt(salario, aliquota_inss)
+              + contadora
+              + fator_mdr * taxas_percentuais + taxas_fixas)
+    return total_vendas - custos
+
+def fatiar_cenarios(lucros, eixos, eixo_x, eixo_y, valores_base):
+    # Fixa os demais eixos no ponto da grade mais próximo dos parâmetros atuais
+    indices = []
+    for nome in EIXOS_CENARIOS:
+        if nome in (eixo_x, eixo_y):
+            indices.append(slice(None))
+        else:
+            indices.append(int(np.abs(np.asarray(eixos[nome]) - valores_base[nome]).argmin()))
+    fatia = lucros[tuple(indices)]
+    nomes_livres = [n for n in EIXOS_CENARIOS if n in (eixo_x, eixo_y)]
+    if nomes_livres[0] != eixo_y:
+        fatia = fatia.T
+    return pd.DataFrame(fatia, index=pd.Index(eixos[eixo_y], name=EIXOS_CENARIOS[eixo_y][0]),
+                        columns=pd.Index(eixos[eixo_x], name=EIXOS_CENARIOS[eixo_x][0]))
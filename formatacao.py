@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# --- FORMATAÇÃO DE VALORES (pt-BR) ---
+def format_currency(value):
+    if pd.isna(value) or value is None:
+        return "R$ -"
+    return f"R$ {float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def format_percent(value):
+    return f"{float(value):.2%}".replace(".", ",")
+
+def format_currency_series(values):
+    """Versão vetorizada de `format_currency` para arrays/Series inteiros (NaN vira "R$ -").
+
+    Os caracteres são montados numa matriz de bytes, coluna a coluna, com aritmética inteira sobre todos os
+    valores ao mesmo tempo; não há chamada de formatação por célula.
+    """
+    valores = np.asarray(values, dtype=float).ravel()
+    if not len(valores):
+        return np.array([], dtype=object)
+    vazios = ~np.isfinite(valores)
+    absolutos = np.abs(np.where(vazios, 0.0, valores))
+    escalados = absolutos * 100
+    centavos = np.rint(escalados).astype(np.int64)
+    # O produto por 100 já arredonda o valor binário (2.675 * 100 dá exatamente 267.5, mas 2.675 vale
+    # 2.67499999...). Perto de meio centavo, os centavos saem do mesmo f-string de `format_currency`
+    empates = np.abs(escalados - np.floor(escalados) - 0.5) <= 4 * np.spacing(escalados)
+    if empates.any():
+        centavos[empates] = [int(f"{v:.2f}".replace(".", "")) for v in absolutos[empates]]
+    inteiros = centavos // 100
+    negativos = (valores < 0) & (centavos > 0)
+    max_digitos = len(str(int(inteiros.max())))
+    digitos = np.ones_like(inteiros)
+    for k in range(1, max_digitos):
+        digitos += inteiros >= 10 ** k
+    largura_inteiro = digitos + (digitos - 1) // 3
+    largura = 3 + 1 + max_digitos + (max_digitos - 1) // 3 + 3  # "R$ " + sinal + parte inteira + ",dd"
+
+    # Matriz alinhada à direita: cada coluna é escrita para todas as linhas de uma vez
+    matriz = np.full((len(valores), largura), ord(' '), dtype=np.uint8)
+    matriz[:, -1] = ord('0') + centavos % 10
+    matriz[:, -2] = ord('0') + (centavos // 10) % 10
+    matriz[:, -3] = ord(',')
+    linhas = np.arange(len(valores))
+    for k in range(max_digitos):
+        coluna = largura - 4 - k - k // 3
+        presente = digitos > k
+        matriz[:, coluna] = np.where(presente, ord('0') + (inteiros // 10 ** k) % 10, ord(' '))
+        if k and k % 3 == 0:
+            matriz[:, coluna + 1] = np.where(presente, ord('.'), ord(' '))
+    inicio_inteiro = largura - 3 - largura_inteiro
+    matriz[linhas[negativos], inicio_inteiro[negativos] - 1] = ord('-')
+    inicio = inicio_inteiro - negativos - 3
+    for deslocamento, caractere in enumerate("R$ "):
+        matriz[linhas, inicio + deslocamento] = ord(caractere)
+
+    # Cada linha vira uma string de bytes de largura fixa; só resta tirar os espaços à esquerda
+    texto = np.char.lstrip(matriz.view(f'S{largura}').ravel()).astype(str)
+    return np.where(vazios, "R$ -", texto).astype(object)
@@ -2,20 +2,30 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import datetime
-import random
 import os
 import numpy as np
 import time
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.pdfgen import canvas
 from io import BytesIO
-import matplotlib.pyplot as plt
-import io
 import base64
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from formatacao import format_currency, format_currency_series, format_percent
+from combinacoes import CARDAPIOS, calculate_combination_value, gerar_dados_geneticos
+from financeiro import (
+    TAXAS_ADQUIRENTE, PARAMETROS_FINANCEIROS, OPCOES_INSS_PATRONAL, EIXOS_CENARIOS, COLUNAS_RECEBIMENTOS, ler_recebimentos, ler_equipe,
+    equipe_padrao, cronograma_folha, tabela_simples_mensal, aliquota_do_mes,
+    dre_mensal, simular_cenarios, fatiar_cenarios
+)
+from relatorio_pdf import create_pdf_report
+from relatorio_lote import gerar_relatorios_mensais, hash_entradas
+from exportacao import planilha_em_bytes
 
 # --- CONSTANTES E CONFIGURAÇÕES ---
 CONFIG = {
@@ -23,40 +33,13 @@ CONFIG = {
     "layout": "centered",
     "sidebar_state": "expanded",
     "excel_file": "recebimentos.xlsx",
-    "logo_path": "logo.png"
-}
-
-CARDAPIOS = {
-    "sanduiches": {
-        "X Salada Simples": 18.00,
-        "X Salada Especial": 20.00,
-        "X Bacon Especial": 24.00,
-        "X Hamburgão": 35.00,
-        "X Mata-Fome": 39.00,
-        "X Frango Simples": 22.00,
-        "X Frango Especial": 24.00,
-        "X Frango Bacon": 27.00,
-        "X Frango Tudo": 30.00,
-        "X Lombo Simples": 23.00,
-        "X Lombo Especial": 26.00,
-        "X Lombo Bacon": 28.00,
-        "X Lombo Tudo": 31.00,
-        "X Filé Simples": 28.00,
-        "X Filé Especial": 30.00,
-        "X Filé Bacon": 33.00,
-        "X Filé Tudo": 36.00
-    },
-    "bebidas": {
-        "Suco": 10.00,
-        "Creme": 15.00,
-        "Refri caçula": 3.50,
-        "Refri Lata": 7.00,
-        "Refri 600": 8.00,
-        "Refri 1L": 10.00,
-        "Refri 2L": 15.00,
-        "Água": 3.00,
-        "Água com Gas": 4.00
-    }
+    "logo_path": "logo.png",
+    "payment_map_file": "formas_pagamento.json",
+    "roster_file": "funcionarios.xlsx",
+    "inbox_dir": os.environ.get("CLIPS_INBOX_DIR", "caixa_entrada"),
+    "inbox_interval": 30,
+    "inbox_state_dir": os.environ.get("CLIPS_INBOX_STATE_DIR", ".estado_caixa_entrada"),
+    "reports_dir": os.environ.get("CLIPS_REPORTS_DIR", "relatorios")
 }
 
 FORMAS_PAGAMENTO = {
@@ -71,11 +54,6 @@ FORMAS_PAGAMENTO = {
 }
 
 # --- FUNÇÕES UTILITÁRIAS ---
-def format_currency(value):
-    if pd.isna(value) or value is None:
-        return "R$ -"
-    return f"R$ {float(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
 def get_global_centered_styles():
     return [
         {'selector': 'th', 'props': [('text-align', 'center'), ('vertical-align', 'middle'), ('background-color', '#262730'), ('color', 'white'), ('padding', '8px')]},
@@ -90,15 +68,10 @@ def init_data_file():
 
 def load_data():
     try:
-        if os.path.exists(CONFIG["excel_file"]):
-            df = pd.read_excel(CONFIG["excel_file"])
-            if not df.empty:
-                df['Data'] = pd.to_datetime(df['Data'])
-                return df.sort_values('Data', ascending=False)
-        return pd.DataFrame(columns=['Data', 'Dinheiro', 'Cartao', 'Pix'])
+        return ler_recebimentos(CONFIG["excel_file"])
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame(columns=['Data', 'Dinheiro', 'Cartao', 'Pix'])
+        return pd.DataFrame(columns=COLUNAS_RECEBIMENTOS)
 
 def save_data(df):
     try:
@@ -108,242 +81,597 @@ def save_data(df):
     except Exception as e:
         st.error(f"Erro ao salvar dados: {e}")
 
-def round_to_50_or_00(value):
-    return int(round(value))
-
-def calculate_combination_value(combination, item_prices):
-    return sum(item_prices.get(name, 0) * quantity for name, quantity in combination.items())
-
-# --- FUNÇÕES PARA ALGORITMO GENÉTICO ---
-def create_individual(item_prices, combination_size):
-    if not item_prices: return {}
-    items = list(item_prices.keys())
-    size = min(combination_size, len(items))
-    selected_items = random.sample(items, size)
-    return {name: int(random.randint(1, 100)) for name in selected_items}
-
-def evaluate_fitness(individual, item_prices, target_value):
-    total = calculate_combination_value(individual, item_prices)
-    if total > target_value: return 1_000_000 + (total - target_value)
-    score = target_value - total
-    if total > 0:
-        limite_concentracao = total * 0.50
-        for item, qty in individual.items():
-            valor_item = item_prices.get(item, 0) * qty
-            if valor_item > limite_concentracao:
-                score += 5000 + (valor_item - limite_concentracao)
-    return score
-
-def crossover(parent1, parent2):
-    all_keys = set(list(parent1.keys()) + list(parent2.keys()))
-    child = {}
-    for key in all_keys:
-        if key in parent1 and key in parent2:
-            child[key] = parent1[key] if random.random() < 0.5 else parent2[key]
-        elif key in parent1:
-            if random.random() < 0.5: child[key] = parent1[key]
-        elif key in parent2:
-            if random.random() < 0.5: child[key] = parent2[key]
-    return child
-
-def mutate(individual, item_prices, mutation_rate=0.2, max_items=5):
-    new_individual = individual.copy()
-    if (random.random() < mutation_rate and len(new_individual) < max_items and len(new_individual) < len(item_prices)):
-        possible_new_items = [item for item in item_prices.keys() if item not in new_individual]
-        if possible_new_items:
-            new_item = random.choice(possible_new_items)
-            new_individual[new_item] = 1
-    if random.random() < mutation_rate and len(new_individual) > 1:
-        item_to_remove = random.choice(list(new_individual.keys()))
-        del new_individual[item_to_remove]
-    for key in list(new_individual.keys()):
-        if random.random() < mutation_rate:
-            change = random.choice([-1, 1]) 
-            new_value = max(1, int(new_individual[key] + change))
-            new_individual[key] = new_value
-    return new_individual
-
-def genetic_algorithm(item_prices, target_value, population_size=50, generations=100, combination_size=5, elite_size=5, tournament_size=3):
-    if not item_prices or target_value <= 0: return {}
-    population = [create_individual(item_prices, combination_size) for _ in range(population_size)]
-    best_individual = {}
-    best_fitness = float('inf')
-    
-    for generation in range(generations):
-        fitness_scores = [(individual, evaluate_fitness(individual, item_prices, target_value)) for individual in population]
-        fitness_scores.sort(key=lambda x: x[1])
-        if fitness_scores[0][1] < best_fitness:
-            best_individual = fitness_scores[0][0].copy()
-            best_fitness = fitness_scores[0][1]
-        if best_fitness == 0: break
-        
-        next_generation = [ind[0].copy() for ind in fitness_scores[:elite_size]]
-        while len(next_generation) < population_size:
-            tournament = random.sample(fitness_scores, tournament_size)
-            tournament.sort(key=lambda x: x[1])
-            parent1 = tournament[0][0]
-            parent2 = random.choice(fitness_scores[:10])[0]
-            child = crossover(parent1, parent2)
-            child = mutate(child, item_prices, max_items=combination_size)
-            next_generation.append(child)
-        population = next_generation
+# --- LEITURA DO ARQUIVO DE TRANSAÇÕES ---
+COLUNAS_DATA = ['data', 'data da venda', 'data da transação', 'data/hora', 'data e hora', 'data hora', 'data_hora']
+COLUNAS_HORA = ['hora', 'hora da venda', 'hora da transação', 'horário']
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+def ler_arquivo_transacoes(arquivo, nome):
+    if nome.endswith(".csv"):
+        try:
+            df = pd.read_csv(arquivo, sep=';', encoding='utf-8', dtype=str)
+        except pd.errors.ParserError:
+            arquivo.seek(0)
+            try:
+                df = pd.read_csv(arquivo, sep=',', encoding='utf-8', dtype=str)
+            except:
+                arquivo.seek(0)
+                df = pd.read_csv(arquivo, engine='python', dtype=str)
+    else:
+        df = pd.read_excel(arquivo, dtype=str)
+    return df
+
+def extrair_data_hora(df):
+    """Procura as colunas de data (e hora, se separada) do extrato e devolve a série de timestamps."""
+    colunas = {str(c).lower().strip(): c for c in df.columns}
+    col_data = next((colunas[c] for c in COLUNAS_DATA if c in colunas), None)
+    if col_data is None:
+        return None
+    texto = df[col_data].astype(str).str.strip()
+    col_hora = next((colunas[c] for c in COLUNAS_HORA if c in colunas), None)
+    if col_hora is not None:
+        texto = texto + ' ' + df[col_hora].fillna('').astype(str).str.strip()
+    return pd.to_datetime(texto, dayfirst=True, errors='coerce')
+
+# --- NORMALIZAÇÃO DAS FORMAS DE PAGAMENTO ---
+def normalizar_chave(texto):
+    # Minúsculas, sem acentos e com espaços colapsados: "Crédito  à Vista VISA" -> "credito a vista visa"
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', texto.lower()).strip()
+
+@lru_cache(maxsize=4)
+def compilar_formas_pagamento(caminho, modificado_em):
+    """Compila a tabela externa (chaves exatas + regras regex); recompila quando o arquivo muda."""
+    exatas = {normalizar_chave(k): v for k, v in FORMAS_PAGAMENTO.items()}
+    regras = []
+    if modificado_em is not None:
+        with open(caminho, encoding="utf-8") as f:
+            tabela = json.load(f)
+        exatas.update({normalizar_chave(k): v for k, v in tabela.get('exatas', {}).items()})
+        regras = [(re.compile(r['padrao']), r['forma']) for r in tabela.get('regras', [])]
+    return exatas, regras
+
+def regras_formas_pagamento():
+    caminho = CONFIG["payment_map_file"]
+    modificado_em = os.path.getmtime(caminho) if os.path.exists(caminho) else None
+    return compilar_formas_pagamento(caminho, modificado_em)
+
+def mapear_formas_pagamento(chaves):
+    """Resolve cada combinação distinta uma única vez e propaga o resultado para todas as linhas."""
+    exatas, regras = regras_formas_pagamento()
+    codigos, unicas = pd.factorize(chaves)
+    formas = []
+    for chave in unicas:
+        chave = normalizar_chave(chave)
+        forma = exatas.get(chave)
+        if forma is None:
+            forma = next((f for padrao, f in regras if padrao.search(chave)), None)
+        formas.append(forma)
+    formas = np.array(formas + [None], dtype=object)
+    return pd.Series(formas[codigos], index=chaves.index)
+
+def normalizar_transacoes(df):
+    """Normaliza um lote do extrato; devolve as transações válidas e o resumo das formas não reconhecidas."""
+    required_cols = ['Tipo', 'Bandeira', 'Valor']
+    if not all(col in df.columns for col in required_cols):
+        raise ValueError(f"O arquivo precisa conter as colunas: {', '.join(required_cols)}")
+
+    datas = extrair_data_hora(df)
+    df['Tipo'] = df['Tipo'].str.lower().str.strip().fillna('desconhecido')
+    df['Bandeira'] = df['Bandeira'].str.lower().str.strip().fillna('desconhecida')
+    df['Valor'] = pd.to_numeric(
+        df['Valor'].str.replace('.', '').str.replace(',', '.'), 
+        errors='coerce')
+    if datas is not None:
+        df['Data'] = datas
+    df = df.dropna(subset=['Valor'])
     
-    final_combination = {k: int(v) for k, v in best_individual.items() if v > 0}
-    final_total = calculate_combination_value(final_combination, item_prices)
-    while final_total > target_value and len(final_combination) > 0:
-        item_to_reduce = random.choice(list(final_combination.keys()))
-        if final_combination[item_to_reduce] <= 1: del final_combination[item_to_reduce]
-        else: final_combination[item_to_reduce] -= 1
-        final_total = calculate_combination_value(final_combination, item_prices)
-    return final_combination
-
-def buscar_combinacao_exata(item_prices, target_value, max_time_seconds=5, population_size=100, generations=200, combination_size=10):
-    start_time = time.time()
-    best_global_individual = {}
-    best_global_diff = float('inf') 
-    attempts = 0
-    while (time.time() - start_time) < max_time_seconds:
-        attempts += 1
-        current_result = genetic_algorithm(item_prices, target_value, population_size, generations, combination_size)
-        current_fitness = evaluate_fitness(current_result, item_prices, target_value)
-        if current_fitness == 0: return current_result, attempts
-        if current_fitness < best_global_diff:
-            best_global_diff = current_fitness
-            best_global_individual = current_result
-    return best_global_individual, attempts
-
-# --- FUNÇÕES PARA GERAR PDF ---
-def create_watermark(canvas, logo_path, width=400, height=400, opacity=0.1):
+    chaves = df['Tipo'] + ' ' + df['Bandeira']
+    df['Forma'] = mapear_formas_pagamento(chaves)
+    sem_forma = df['Forma'].isna()
+    nao_mapeadas = df.loc[sem_forma, 'Valor'].groupby(chaves[sem_forma].rename('Combinação')).agg(
+        Transacoes='size', Valor='sum').reset_index()
+    return df[~sem_forma], nao_mapeadas
+
+def agregar_hora_dia_semana(df):
+    """Pré-agrega as transações em células Forma × hora × dia da semana com um único groupby."""
+    colunas = ['Forma', 'Hora', 'DiaSemana', 'Transacoes', 'Valor']
+    if 'Data' not in df.columns or df['Data'].isna().all():
+        return pd.DataFrame(columns=colunas)
+    validos = df.dropna(subset=['Data'])
+    grade = validos.groupby(
+        [validos['Forma'], validos['Data'].dt.hour.rename('Hora'), validos['Data'].dt.dayofweek.rename('DiaSemana')]
+    )['Valor'].agg(Transacoes='size', Valor='sum').reset_index()
+    return grade[colunas]
+
+def consolidar_transacoes(df, nao_mapeadas):
+    vendas = df.groupby('Forma')['Valor'].sum().reset_index()
+    nao_mapeadas = nao_mapeadas.groupby('Combinação', as_index=False)[['Transacoes', 'Valor']].sum()
+    return {
+        'transacoes': df,
+        'vendas': vendas,
+        'grade_horaria': agregar_hora_dia_semana(df),
+        'nao_mapeadas': nao_mapeadas.sort_values('Valor', ascending=False, ignore_index=True)
+    }
+
+def processar_lotes(lotes, ao_processar=None):
+    partes, ignoradas = [], []
+    for lote in lotes:
+        validas, nao_mapeadas = normalizar_transacoes(lote)
+        partes.append(validas)
+        ignoradas.append(nao_mapeadas)
+        if ao_processar:
+            ao_processar(len(lote), len(validas))
+    if not partes:
+        raise ValueError("O arquivo está vazio.")
+    return consolidar_transacoes(pd.concat(partes, ignore_index=True), pd.concat(ignoradas, ignore_index=True))
+
+def ler_em_lotes(conteudo, nome, tamanho_lote=50_000):
+    if nome.endswith(".csv"):
+        cabecalho = conteudo[:conteudo.find(b'\n')]
+        sep = ';' if cabecalho.count(b';') >= cabecalho.count(b',') else ','
+        yield from pd.read_csv(BytesIO(conteudo), sep=sep, encoding='utf-8', dtype=str, chunksize=tamanho_lote)
+    else:
+        df = ler_arquivo_transacoes(BytesIO(conteudo), nome)
+        for ini in range(0, len(df), tamanho_lote):
+            yield df.iloc[ini:ini + tamanho_lote].copy()
+
+# --- INGESTÃO EM SEGUNDO PLANO ---
+@st.cache_resource
+def executor_ingestao():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingestao")
+
+@st.cache_resource
+def tarefas_ingestao():
+    # Compartilhado entre sessões e reruns; chave = hash do conteúdo do arquivo
+    return {'tarefas': {}, 'lock': threading.Lock()}
+
+def processar_em_segundo_plano(conteudo, nome, tarefa):
     try:
-        if os.path.exists(logo_path):
-            canvas.saveState()
-            canvas.setFillColorRGB(255, 255, 255, alpha=opacity)
-            canvas.drawImage(logo_path, (A4[0] - width) / 2, (A4[1] - height) / 2, 
-                             width=width, height=height, mask='auto', preserveAspectRatio=True)
-            canvas.restoreState()
+        total_linhas = max(conteudo.count(b'\n'), 1) if nome.endswith(".csv") else None
+
+        def ao_processar(linhas, validas):
+            tarefa['linhas'] += linhas
+            tarefa['validas'] += validas
+            if total_linhas:
+                tarefa['progresso'] = min(tarefa['linhas'] / total_linhas, 0.99)
+
+        tarefa['resultado'] = processar_lotes(ler_em_lotes(conteudo, nome), ao_processar)
+        tarefa['progresso'] = 1.0
     except Exception as e:
-        print(f"Erro ao adicionar marca d'água: {e}")
-
-def fig_to_buffer(fig):
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-    buf.seek(0)
-    return buf
-
-def create_pdf_report(df, vendas, total_vendas, imposto_simples, custo_funcionario, 
-                    custo_contadora, total_custos, lucro_estimado, logo_path):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    heading_style = styles['Heading1']
-    subheading_style = styles['Heading2']
-    normal_style = styles['Normal']
-    elements = []
-    
+        tarefa['erro'] = str(e)
+    finally:
+        tarefa['concluida'] = True
+
+def iniciar_ingestao(conteudo, nome, envio=None, max_tarefas=5):
+    """Enfileira o arquivo para processamento; o mesmo conteúdo reaproveita a tarefa existente.
+
+    Uma tarefa com erro só é refeita num novo envio do arquivo (`envio` = file_id do uploader): nos reruns
+    do mesmo envio ela é mantida para que o erro apareça na tela.
+    """
+    chave = hashlib.sha1(conteudo).hexdigest()
+    registro = tarefas_ingestao()
+    with registro['lock']:
+        tarefa = registro['tarefas'].get(chave)
+        if tarefa is None or (tarefa['erro'] and tarefa['envio'] != envio):
+            tarefa = {'chave': chave, 'nome': nome, 'envio': envio, 'progresso': 0.0, 'linhas': 0, 'validas': 0,
+                      'resultado': None, 'erro': None, 'concluida': False, 'inicio': time.time()}
+            registro['tarefas'][chave] = tarefa
+            while len(registro['tarefas']) > max_tarefas:
+                registro['tarefas'].pop(next(iter(registro['tarefas'])))
+            executor_ingestao().submit(processar_em_segundo_plano, conteudo, nome, tarefa)
+    return tarefa
+
+# --- CAIXA DE ENTRADA (INGESTÃO AUTOMÁTICA) ---
+def mesclar_resultados(atual, novo):
+    """Soma os agregados de um novo arquivo aos já consolidados, sem reagrupar o histórico.
+
+    As transações não entram aqui: cada arquivo guarda as suas em `caixa['partes']` (ver `resultado_ingestao`).
+    """
+    if atual is None:
+        return novo
+    return {
+        'vendas': pd.concat([atual['vendas'], novo['vendas']]).groupby('Forma', as_index=False)['Valor'].sum(),
+        'grade_horaria': pd.concat([atual['grade_horaria'], novo['grade_horaria']]).groupby(
+            ['Forma', 'Hora', 'DiaSemana'], as_index=False)[['Transacoes', 'Valor']].sum(),
+        'nao_mapeadas': pd.concat([atual['nao_mapeadas'], novo['nao_mapeadas']]).groupby(
+            'Combinação', as_index=False)[['Transacoes', 'Valor']].sum()
+    }
+
+# O estado fica fora da pasta vigiada: nada do que chega nela (downloads) é desserializado
+def salvar_caixa_entrada(caixa):
+    pasta = CONFIG["inbox_state_dir"]
+    os.makedirs(os.path.join(pasta, "transacoes"), exist_ok=True)
+    with caixa['lock']:
+        processados, resultado, partes = dict(caixa['processados']), caixa['resultado'], dict(caixa['partes'])
+    with open(os.path.join(pasta, "processados.json"), "w", encoding="utf-8") as f:
+        json.dump(processados, f, ensure_ascii=False, indent=2)
+    if resultado is not None:
+        pd.to_pickle(resultado, os.path.join(pasta, "consolidado.pkl"))
+    # As transações de cada arquivo são gravadas uma única vez, sem regravar o histórico
+    for chave, transacoes in partes.items():
+        caminho = os.path.join(pasta, "transacoes", f"{chave}.pkl")
+        if not os.path.exists(caminho):
+            pd.to_pickle(transacoes, caminho)
+
+def carregar_caixa_entrada(caixa):
+    pasta = CONFIG["inbox_state_dir"]
     try:
-        if os.path.exists(logo_path):
-            img = Image(logo_path, width=2*inch, height=1.5*inch)
-            img.hAlign = 'CENTER'
-            elements.append(img)
-            elements.append(Spacer(1, 0.5*inch))
+        caminho_registro = os.path.join(pasta, "processados.json")
+        if os.path.exists(caminho_registro):
+            with open(caminho_registro, encoding="utf-8") as f:
+                caixa['processados'] = json.load(f)
+        caminho_consolidado = os.path.join(pasta, "consolidado.pkl")
+        if os.path.exists(caminho_consolidado):
+            caixa['resultado'] = pd.read_pickle(caminho_consolidado)
+            # Estado gravado com as transações de todos os arquivos juntas
+            if 'transacoes' in caixa['resultado']:
+                caixa['partes']['anteriores'] = caixa['resultado'].pop('transacoes')
+        importados = [chave for chave, registro in caixa['processados'].items() if 'erro' not in registro]
+        for chave in ['anteriores', *importados]:
+            caminho = os.path.join(pasta, "transacoes", f"{chave}.pkl")
+            if chave not in caixa['partes'] and os.path.exists(caminho):
+                caixa['partes'][chave] = pd.read_pickle(caminho)
     except Exception as e:
-        print(f"Erro ao adicionar logo: {e}")
-    
-    elements.append(Paragraph("Relatório Financeiro - Clips Burger", title_style))
-    elements.append(Spacer(1, 0.5*inch))
-    elements.append(Paragraph(f"Data do relatório: {datetime.now().strftime('%d/%m/%Y')}", normal_style))
-    elements.append(Spacer(1, 0.25*inch))
-    elements.append(Paragraph("Resumo Financeiro", heading_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    data = [
-        ["Métrica", "Valor"],
-        ["Faturamento Bruto", format_currency(total_vendas)],
-        ["Imposto Simples (6%)", format_currency(imposto_simples)],
-        ["Custo Funcionário CLT", format_currency(custo_funcionario)],
-        ["Custo Contadora", format_currency(custo_contadora)],
-        ["Total de Custos", format_currency(total_custos)],
-        ["Lucro Estimado", format_currency(lucro_estimado)]
-    ]
-    
-    table = Table(data, colWidths=[doc.width/2.5, doc.width/2.5])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (1, 0), 12),
-        ('BACKGROUND', (0, -1), (1, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    elements.append(Paragraph("Análise de Vendas", heading_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+        print(f"Erro ao carregar a caixa de entrada: {e}")
+
+def verificar_caixa_entrada(caixa):
+    pasta = caixa['pasta']
+    novos = 0
+    presentes = set()
+    for nome in sorted(os.listdir(pasta)):
+        caminho = os.path.join(pasta, nome)
+        if nome.startswith(('.', '~$')) or not nome.lower().endswith(('.csv', '.xlsx')):
+            continue
+        info = os.stat(caminho)
+        # Ignora arquivos que ainda podem estar sendo gravados
+        if time.time() - info.st_mtime < 2:
+            continue
+        assinatura = (nome, info.st_size, info.st_mtime)
+        presentes.add(assinatura)
+        if assinatura in caixa['vistos']:
+            continue
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        chave = hashlib.sha1(conteudo).hexdigest()
+        caixa['vistos'][assinatura] = chave
+        if chave in caixa['processados']:
+            continue
+
+        registro = {'arquivo': nome, 'data': datetime.now().isoformat(timespec='seconds')}
+        try:
+            novo = processar_lotes(ler_em_lotes(conteudo, nome.lower()))
+            with caixa['lock']:
+                caixa['partes'][chave] = novo.pop('transacoes')
+                caixa['resultado'] = mesclar_resultados(caixa['resultado'], novo)
+            registro['linhas'] = len(caixa['partes'][chave])
+            novos += 1
+        except Exception as e:
+            registro['erro'] = str(e)
+        with caixa['lock']:
+            caixa['processados'][chave] = registro
+
+    # Esquece os arquivos que saíram da pasta (o hash de conteúdo em 'processados' continua evitando reimportar)
+    caixa['vistos'] = {a: c for a, c in caixa['vistos'].items() if a in presentes}
+    if novos:
+        caixa['versao'] += 1
+    caixa['ultima_verificacao'] = datetime.now()
+    return novos
+
+def vigiar_caixa_entrada(caixa):
+    while True:
+        try:
+            # A pasta pode ser criada depois do início do servidor
+            if os.path.isdir(caixa['pasta']) and verificar_caixa_entrada(caixa):
+                salvar_caixa_entrada(caixa)
+        except Exception as e:
+            print(f"Erro ao verificar a caixa de entrada: {e}")
+        time.sleep(CONFIG["inbox_interval"])
+
+@st.cache_resource
+def caixa_entrada():
+    """Inicia (uma vez por servidor) a thread que vigia a pasta de extratos da adquirente."""
+    pasta = CONFIG["inbox_dir"]
+    caixa = {'pasta': pasta, 'nome': "Caixa de entrada", 'resultado': None, 'versao': 0,
+             'processados': {}, 'vistos': {}, 'partes': {}, 'consolidado': (None, None), 'ultima_verificacao': None,
+             'progresso': 1.0, 'concluida': True, 'erro': None, 'lock': threading.Lock()}
+    carregar_caixa_entrada(caixa)
+    threading.Thread(target=vigiar_caixa_entrada, args=(caixa,), daemon=True, name="caixa-entrada").start()
+    return caixa
+
+def resultado_ingestao(tarefa):
+    """Resultado de um upload ou da caixa de entrada, no mesmo formato de `processar_lotes`.
+
+    Na caixa de entrada as transações de cada arquivo só são concatenadas aqui, uma vez por versão.
+    """
+    if 'partes' not in tarefa:
+        return tarefa['resultado']
+    with tarefa['lock']:
+        versao, agregados, partes = tarefa['versao'], tarefa['resultado'], list(tarefa['partes'].values())
+    if agregados is None:
+        return None
+    if tarefa['consolidado'][0] != versao:
+        transacoes = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+        tarefa['consolidado'] = (versao, {**agregados, 'transacoes': transacoes})
+    return tarefa['consolidado'][1]
+
+def resultado_da_sessao(tarefa):
+    """Cópia do resultado da ingestão para esta sessão, feita uma vez por resultado.
+
+    Os DataFrames de `tarefas_ingestao` e da caixa de entrada são compartilhados por todas as sessões;
+    a página só trabalha sobre a cópia, então uma alteração no lugar não vaza para as outras.
+    """
+    resultado = resultado_ingestao(tarefa)
+    if resultado is None:
+        return None
+    if st.session_state.get('origem_resultado') is not resultado:
+        st.session_state.origem_resultado = resultado
+        st.session_state.copia_resultado = {chave: df.copy() for chave, df in resultado.items()}
+    return st.session_state.copia_resultado
+
+@st.experimental_fragment(run_every=CONFIG["inbox_interval"])
+def monitorar_caixa_entrada():
+    caixa = caixa_entrada()
+    if not os.path.isdir(caixa['pasta']):
+        st.caption(f"📥 Crie a pasta `{caixa['pasta']}` para importar extratos automaticamente.")
+        return
+    with caixa['lock']:
+        registros = list(caixa['processados'].values())
+    arquivos = sum(1 for r in registros if 'erro' not in r)
+    verificacao = caixa['ultima_verificacao'].strftime('%H:%M:%S') if caixa['ultima_verificacao'] else "-"
+    st.caption(f"📥 Caixa de entrada: {arquivos} arquivo(s) importado(s) · verificada às {verificacao}")
+    for registro in registros:
+        if 'erro' in registro:
+            st.caption(f"⚠️ {registro['arquivo']}: {registro['erro']}")
+    # Atualiza a página quando novos arquivos chegam e a sessão está exibindo a caixa de entrada
+    if st.session_state.tarefa_ingestao is caixa and st.session_state.get('versao_caixa') != caixa['versao']:
+        st.session_state.versao_caixa = caixa['versao']
+        st.rerun()
+
+@st.experimental_fragment(run_every=1)
+def acompanhar_ingestao(tarefa):
+    if tarefa['concluida']:
+        st.rerun()
+    st.progress(tarefa['progresso'],
+                text=f"Processando {tarefa['nome']}... {tarefa['progresso']:.0%} "
+                     f"({tarefa['linhas']:,} linhas lidas, {tarefa['validas']:,} válidas)".replace(",", "."))
+    st.caption("Você pode continuar usando as outras abas enquanto o arquivo é carregado.")
+
+def criar_mapa_calor(grade, formas, metrica):
+    # Filtros atuam apenas sobre a grade pré-agregada, sem reler as transações
+    grade = grade[grade['Forma'].isin(formas)]
+    celulas = grade.groupby(['Hora', 'DiaSemana'])[['Transacoes', 'Valor']].sum().reset_index()
+    celulas['Faturamento'] = celulas['Valor']
+    celulas['Transações'] = celulas['Transacoes']
+    celulas['Ticket Médio'] = celulas['Valor'] / celulas['Transacoes'].where(celulas['Transacoes'] > 0)
+    celulas['Dia'] = celulas['DiaSemana'].map(dict(enumerate(DIAS_SEMANA)))
+
+    return alt.Chart(celulas).mark_rect().encode(
+        x=alt.X('Hora:O', title='Hora do Dia'),
+        y=alt.Y('Dia:N', sort=DIAS_SEMANA, title=''),
+        color=alt.Color(f'{metrica}:Q', scale=alt.Scale(scheme='orangered'), title=metrica),
+        tooltip=['Dia', 'Hora', 'Transações', alt.Tooltip('Faturamento:Q', format=',.2f'),
+                 alt.Tooltip('Ticket Médio:Q', format=',.2f')]
+    ).properties(height=300)
+
+# --- TAXAS DA ADQUIRENTE (MDR) ---
+def tabela_taxas_padrao():
+    return pd.DataFrame([
+        {'Forma': forma, 'Percentual (%)': t['percentual'], 'Tarifa Fixa (R$)': t['fixa'], 'Prazo (dias)': t['prazo_dias']}
+        for forma, t in TAXAS_ADQUIRENTE.items()
+    ])
+
+def aplicar_taxas_adquirente(df, tabela_taxas, data_base=None):
+    """Calcula taxa, valor líquido e data prevista de liquidação de cada transação."""
+    taxas = tabela_taxas.set_index('Forma')
+    percentual = df['Forma'].map(taxas['Percentual (%)']).fillna(0).to_numpy(dtype=float)
+    fixa = df['Forma'].map(taxas['Tarifa Fixa (R$)']).fillna(0).to_numpy(dtype=float)
+    prazo = df['Forma'].map(taxas['Prazo (dias)']).fillna(0).to_numpy(dtype=float)
+
+    valores = df['Valor'].to_numpy(dtype=float)
+    resultado = df.copy()
+    resultado['Taxa'] = np.round(valores * percentual / 100 + fixa, 2)
+    resultado['Liquido'] = valores - resultado['Taxa'].to_numpy()
+
+    if 'Data' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Data']):
+        datas = df['Data'].dt.normalize().fillna(pd.Timestamp.today().normalize())
+    else:
+        datas = pd.Series(data_base or pd.Timestamp.today().normalize(), index=df.index)
+    resultado['Liquidacao'] = datas + pd.to_timedelta(prazo, unit='D')
+    return resultado
+
+def resumir_liquidacao(df_liquido):
+    vendas = df_liquido.groupby('Forma').agg(
+        Valor=('Valor', 'sum'), Taxa=('Taxa', 'sum'), Liquido=('Liquido', 'sum')).reset_index()
+    agenda = df_liquido.groupby('Liquidacao').agg(
+        Transacoes=('Valor', 'size'), Liquido=('Liquido', 'sum')).reset_index()
+    return vendas, agenda
+
+# --- FOLHA DE PAGAMENTO ---
+def load_equipe():
     try:
-        fig, ax = plt.subplots(figsize=(8, 5))
-        vendas.plot(kind='bar', x='Forma', y='Valor', ax=ax, color='steelblue')
-        ax.set_title('Vendas por Forma de Pagamento')
-        ax.set_ylabel('Valor (R$)')
-        ax.set_xlabel('')
-        plt.tight_layout()
-        img_buf = fig_to_buffer(fig)
-        img = Image(img_buf, width=doc.width, height=4*inch)
-        elements.append(img)
-        elements.append(Spacer(1, 0.25*inch))
-        plt.close(fig)
+        return ler_equipe(CONFIG["roster_file"])
     except Exception as e:
-        elements.append(Paragraph(f"Erro ao gerar gráfico de vendas: {e}", normal_style))
-    
+        st.error(f"Erro ao carregar funcionários: {e}")
+    return equipe_padrao()
+
+def save_equipe(equipe):
     try:
-        custos_df = pd.DataFrame({
-            'Item': ['Impostos', 'Funcionário', 'Contadora'],
-            'Valor': [imposto_simples, custo_funcionario, custo_contadora]
-        })
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.pie(custos_df['Valor'], labels=custos_df['Item'], autopct='%1.1f%%', startangle=90, shadow=True)
-        ax.set_title('Composição dos Custos')
-        plt.tight_layout()
-        img_buf = fig_to_buffer(fig)
-        img = Image(img_buf, width=doc.width, height=4*inch)
-        elements.append(img)
-        plt.close(fig)
+        equipe.to_excel(CONFIG["roster_file"], index=False)
+        st.success("Equipe salva com sucesso!")
     except Exception as e:
-        elements.append(Paragraph(f"Erro ao gerar gráfico de custos: {e}", normal_style))
-    
-    elements.append(Spacer(1, 0.5*inch))
-    elements.append(Paragraph("Detalhamento por Forma de Pagamento", subheading_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    data = [["Forma de Pagamento", "Valor"]]
-    for _, row in vendas.iterrows():
-        data.append([row['Forma'], format_currency(row['Valor'])])
-    
-    table = Table(data, colWidths=[doc.width/2, doc.width/4])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, inch))
-    footer_text = "Este relatório foi gerado automaticamente pelo Sistema de Gestão da Clips Burger."
-    elements.append(Paragraph(footer_text, normal_style))
-    
-    def add_watermark(canvas, doc):
-        create_watermark(canvas, logo_path, width=300, height=300, opacity=0.1)
-    
-    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
-    buffer.seek(0)
-    return buffer
+        st.error(f"Erro ao salvar funcionários: {e}")
+
+# --- CONCILIAÇÃO COM OS RECEBIMENTOS REGISTRADOS ---
+def conciliar_recebimentos(df_transacoes, df_receipts, tolerancia=1.0):
+    """Cruza os totais diários da adquirente (Cartão/PIX) com os fechamentos digitados em recebimentos.xlsx."""
+    colunas = ['Cartao', 'Pix']
+    transacoes = df_transacoes.dropna(subset=['Data'])
+    grupo = np.where(transacoes['Forma'] == 'PIX', 'Pix', 'Cartao')
+    adquirente = transacoes.groupby([transacoes['Data'].dt.normalize().rename('Data'), grupo])['Valor'].sum()\
+        .unstack(fill_value=0.0).reindex(columns=colunas, fill_value=0.0)
+
+    registros = df_receipts.dropna(subset=['Data'])
+    registros = registros.groupby(pd.to_datetime(registros['Data']).dt.normalize())[colunas].sum()
+    # Só compara o período coberto pelo extrato (índices ordenados pelo groupby)
+    registros = registros.loc[adquirente.index.min():adquirente.index.max()]
+
+    conciliacao = adquirente.add_suffix(' Adquirente').join(registros.add_suffix(' Registrado'), how='outer')
+    for col in colunas:
+        conciliacao[f'Diferença {col}'] = conciliacao[f'{col} Registrado'] - conciliacao[f'{col} Adquirente']
+
+    diferencas = conciliacao[[f'Diferença {col}' for col in colunas]].abs()
+    conciliacao['Status'] = np.select(
+        [conciliacao['Cartao Registrado'].isna(), conciliacao['Cartao Adquirente'].isna(), (diferencas > tolerancia).any(axis=1)],
+        ['Sem registro', 'Sem transações', 'Divergente'], default='OK')
+    return conciliacao.rename_axis('Data').reset_index()
+
+# --- DECOMPOSIÇÃO EM LOTE DAS TRANSAÇÕES ---
+# Acima disso a transação não é um pedido de balcão plausível: fica fora da decomposição (e do valor explicado),
+# e as tabelas de programação dinâmica não crescem com um valor atípico
+VALOR_MAXIMO_DECOMPOSICAO = 2_000.00
+
+def precos_em_unidades(item_prices, unidade_centavos):
+    return np.round(np.array(list(item_prices.values()), dtype=float) * 100).astype(np.int64) // unidade_centavos
+
+def unidade_do_cardapio():
+    # Maior divisor comum dos preços em centavos (R$ 0,50 no cardápio atual)
+    centavos = [int(round(p * 100)) for menu in CARDAPIOS.values() for p in menu.values()]
+    return int(np.gcd.reduce(centavos))
+
+@st.cache_data(show_spinner=False)
+def tabela_menor_combinacao(precos_unid, max_unid):
+    """Programação dinâmica de troco: menor nº de itens para cada valor e o item que o alcança."""
+    n = max_unid + 1
+    sem_solucao = np.iinfo(np.int32).max
+    contagem = np.full(n, sem_solucao, dtype=np.int32)
+    escolha = np.full(n, -1, dtype=np.int32)
+    contagem[0] = 0
+    fronteira = np.zeros(n, dtype=bool)
+    fronteira[0] = True
+    passo = 0
+    # Expansão em camadas (BFS): cada camada adiciona um item a todos os valores da fronteira
+    while fronteira.any():
+        passo += 1
+        nova_fronteira = np.zeros(n, dtype=bool)
+        for i, preco in enumerate(precos_unid):
+            if preco <= 0 or preco >= n:
+                continue
+            alcancados = np.zeros(n, dtype=bool)
+            alcancados[preco:] = fronteira[:n - preco]
+            novos = alcancados & (contagem == sem_solucao)
+            contagem[novos] = passo
+            escolha[novos] = i
+            nova_fronteira |= novos
+        fronteira = nova_fronteira
+    return contagem, escolha
+
+def expandir_combinacoes(valores_unid, escolha, precos_unid):
+    """Reconstrói as quantidades por item de vários valores de uma vez a partir da tabela de escolhas."""
+    restante = np.asarray(valores_unid, dtype=np.int64).copy()
+    quantidades = np.zeros((len(restante), len(precos_unid)), dtype=np.int64)
+    linhas = np.arange(len(restante))
+    while True:
+        ativos = restante > 0
+        if not ativos.any():
+            break
+        itens = escolha[restante[ativos]]
+        np.add.at(quantidades, (linhas[ativos], itens), 1)
+        restante[ativos] -= precos_unid[itens]
+    return quantidades
+
+def decompor_transacoes(valores, drink_pct, tamanho_lote=256):
+    """Decompõe cada valor de transação em um pedido provável; valores repetidos são resolvidos uma única vez."""
+    inicio = time.time()
+    unidade = unidade_do_cardapio()
+    precos_s = precos_em_unidades(CARDAPIOS["sanduiches"], unidade)
+    precos_b = precos_em_unidades(CARDAPIOS["bebidas"], unidade)
+
+    centavos = np.round(np.asarray(valores, dtype=float) * 100).astype(np.int64)
+    centavos = np.clip(centavos, 0, None)
+    valores_unicos, inverso, ocorrencias = np.unique(centavos // unidade, return_inverse=True, return_counts=True)
+    acima = valores_unicos > int(round(VALOR_MAXIMO_DECOMPOSICAO * 100)) // unidade
+    decompostos = np.where(acima, 0, valores_unicos)
+    max_unid = int(decompostos.max()) if len(decompostos) else 0
+
+    cont_s, esc_s = tabela_menor_combinacao(tuple(precos_s.tolist()), max_unid)
+    cont_b, esc_b = tabela_menor_combinacao(tuple(precos_b.tolist()), max_unid)
+    alcanca_s = cont_s < np.iinfo(np.int32).max
+    alcanca_b = cont_b < np.iinfo(np.int32).max
+
+    # Maior valor <= alvo que pode ser formado exatamente por sanduíches + bebidas
+    # (soma de Minkowski dos alcançáveis via FFT: O(n log n) em vez da convolução direta O(n²))
+    tamanho_fft = 2 * (max_unid + 1)
+    somas = np.fft.irfft(np.fft.rfft(alcanca_s.astype(float), tamanho_fft) * np.fft.rfft(alcanca_b.astype(float), tamanho_fft),
+                         tamanho_fft)[:max_unid + 1]
+    alcanca_total = somas > 0.5
+    indices = np.arange(max_unid + 1)
+    piso_total = np.maximum.accumulate(np.where(alcanca_total, indices, 0))
+    alvos = piso_total[decompostos]
+
+    # Para cada alvo escolhe a parte de sanduíches mais próxima do percentual configurado,
+    # desempatando pelo menor número de itens
+    parte_s = np.zeros(len(alvos), dtype=np.int64)
+    for ini in range(0, len(alvos), tamanho_lote):
+        lote = alvos[ini:ini + tamanho_lote]
+        colunas = np.arange(int(lote.max()) + 1)
+        resto = lote[:, None] - colunas[None, :]
+        validos = (resto >= 0) & alcanca_s[colunas][None, :] & alcanca_b[np.clip(resto, 0, None)]
+        meta_s = lote * (1 - drink_pct / 100)
+        itens = cont_s[colunas][None, :].astype(float) + cont_b[np.clip(resto, 0, None)].astype(float)
+        score = np.abs(colunas[None, :] - meta_s[:, None]) * 1000 + itens
+        score[~validos] = np.inf
+        parte_s[ini:ini + tamanho_lote] = score.argmin(axis=1)
+    parte_b = alvos - parte_s
+
+    qtd_s = expandir_combinacoes(parte_s, esc_s, precos_s)
+    qtd_b = expandir_combinacoes(parte_b, esc_b, precos_b)
+
+    produtos = []
+    for categoria, menu, qtd in (("Sanduíches", CARDAPIOS["sanduiches"], qtd_s), ("Bebidas", CARDAPIOS["bebidas"], qtd_b)):
+        totais = (qtd * ocorrencias[:, None]).sum(axis=0)
+        produtos.append(pd.DataFrame({
+            'Categoria': categoria,
+            'Produto': list(menu.keys()),
+            'Quantidade': totais,
+            'Receita Estimada': totais * np.array(list(menu.values()))
+        }))
+    df_produtos = pd.concat(produtos, ignore_index=True)
+    df_produtos = df_produtos[df_produtos['Quantidade'] > 0].sort_values('Quantidade', ascending=False)
+
+    valor_explicado = alvos[inverso] * unidade / 100
+    return {
+        'produtos': df_produtos.reset_index(drop=True),
+        'transacoes': len(centavos),
+        'valores_unicos': len(valores_unicos),
+        'valor_total': centavos.sum() / 100,
+        'valor_explicado': valor_explicado.sum(),
+        'acima_do_limite': int(ocorrencias[acima].sum()),
+        'valor_acima_do_limite': float((valores_unicos[acima] * ocorrencias[acima]).sum() * unidade / 100),
+        'tempo': time.time() - inicio
+    }
+
+# --- RELATÓRIO PDF ---
+@st.cache_resource(show_spinner=False, max_entries=8)
+def relatorio_pdf_em_cache(df, vendas, total_vendas, imposto_simples, custo_funcionario, custo_contadora,
+                           total_custos, lucro_estimado, taxas_adquirente, aliquota_simples,
+                           historico_simples, folha_pagamento, dre, recebimentos=None):
+    """Bytes do relatório PDF, gerados uma vez por combinação de entradas e reaproveitados entre reruns.
+
+    Com `df` e `recebimentos` o relatório inclui as listagens completas de transações e recebimentos diários.
+    """
+    buffer = create_pdf_report(
+        df, vendas, total_vendas, imposto_simples, custo_funcionario, custo_contadora, total_custos,
+        lucro_estimado, CONFIG["logo_path"], taxas_adquirente=taxas_adquirente, aliquota_simples=aliquota_simples,
+        historico_simples=historico_simples, folha_pagamento=folha_pagamento, dre=dre,
+        recebimentos=recebimentos, detalhar_transacoes=df is not None
+    )
+    return buffer.getvalue()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def planilha_em_cache(recebimentos, transacoes, combinacoes):
+    """Bytes da planilha exportada, gerados uma vez por combinação de entradas."""
+    return planilha_em_bytes(recebimentos, transacoes, combinacoes)
 
 def create_altair_chart(data, chart_type, x_col, y_col, color_col=None, title=None, interactive=True):
     if chart_type == 'line':
@@ -373,35 +701,245 @@ def create_altair_chart(data, chart_type, x_col, y_col, color_col=None, title=No
     )
     return chart.interactive() if interactive else chart
 
-# --- LÓGICA DE PROCESSAMENTO GENÉTICO (SEPARADA) ---
-def gerar_dados_geneticos(valor_alvo_total, drink_pct, pop_size, n_gens, tam_sand, tam_beb):
-    target_sanduiches_inicial = valor_alvo_total * (1 - drink_pct/100)
-    
-    combinacao_sanduiches, t_sand = buscar_combinacao_exata(
-        CARDAPIOS["sanduiches"], target_sanduiches_inicial, max_time_seconds=5, 
-        population_size=pop_size, generations=n_gens, combination_size=tam_sand
-    )
-    valor_real_sanduiches = calculate_combination_value(combinacao_sanduiches, CARDAPIOS["sanduiches"])
-    
-    target_bebidas_corrigido = valor_alvo_total - valor_real_sanduiches
-    
-    combinacao_bebidas, t_beb = buscar_combinacao_exata(
-        CARDAPIOS["bebidas"], target_bebidas_corrigido, max_time_seconds=5, 
-        population_size=pop_size, generations=n_gens, combination_size=tam_beb
-    )
-    
-    valor_real_bebidas = calculate_combination_value(combinacao_bebidas, CARDAPIOS["bebidas"])
-    valor_real_total = valor_real_sanduiches + valor_real_bebidas
-    
-    return {
-        'sanduiches': combinacao_sanduiches,
-        'bebidas': combinacao_bebidas,
-        'val_sand': valor_real_sanduiches,
-        'val_beb': valor_real_bebidas,
-        'val_total': valor_real_total,
-        'alvo': valor_alvo_total,
-        'ciclos': t_sand + t_beb
-    }
+# --- GRÁFICOS DOS RECEBIMENTOS (AGREGAÇÃO NO SERVIDOR) ---
+# Granularidades em ordem crescente: frequência do pandas, nome, dias aproximados por ponto e rótulo do eixo
+GRANULARIDADES = [
+    ('D', "Dia", 1, '%d/%m/%Y'),
+    ('W', "Semana", 7, '%d/%m/%Y'),
+    ('M', "Mês", 30.44, '%m/%Y'),
+    ('Q', "Trimestre", 91.31, '%m/%Y'),
+    ('Y', "Ano", 365.25, '%Y')
+]
+LIMITE_PONTOS_GRAFICO = 120
+
+def escolher_granularidade(inicio, fim, limite_pontos=LIMITE_PONTOS_GRAFICO):
+    """Menor granularidade em que o período cabe no orçamento de pontos por série."""
+    dias = (pd.Timestamp(fim) - pd.Timestamp(inicio)).days + 1
+    for granularidade in GRANULARIDADES:
+        if dias / granularidade[2] <= limite_pontos:
+            return granularidade
+    return GRANULARIDADES[-1]
+
+def agregar_recebimentos(df, granularidade):
+    """Soma os recebimentos por período; o gráfico recebe uma linha por período, não uma por dia registrado."""
+    freq, _, _, formato = granularidade
+    periodos = pd.to_datetime(df['Data']).dt.to_period(freq).rename('Período')
+    agregado = df[['Dinheiro', 'Cartao', 'Pix']].groupby(periodos).sum()\
+        .rename(columns={'Cartao': 'Cartão', 'Pix': 'PIX'})
+    agregado['Total'] = agregado.sum(axis=1)
+    agregado['Acumulado'] = agregado['Total'].cumsum()
+    inicio = agregado.index.to_timestamp(how='start')
+    agregado = agregado.reset_index(drop=True)
+    agregado.insert(0, 'Rótulo', inicio.strftime(formato))
+    agregado.insert(0, 'Início', inicio)
+    return agregado
+
+# --- TABELA PAGINADA DOS RECEBIMENTOS ---
+# Colunas da tabela detalhada e seus títulos; a ordenação usa os valores brutos, antes da formatação
+COLUNAS_DETALHE = {'Data': "Data", 'Dinheiro': "Dinheiro", 'Cartao': "Cartão", 'Pix': "PIX", 'Total': "Total"}
+OPCOES_POR_PAGINA = [25, 50, 100, 250]
+
+def total_de_paginas(linhas, por_pagina):
+    return max(1, -(-linhas // por_pagina))
+
+def pagina_recebimentos(df, colunas, ordenar_por, crescente, pagina, por_pagina):
+    """Ordena pela coluna escolhida e formata só as linhas da página; o resto do histórico não sai do servidor."""
+    posicoes = df[ordenar_por].to_numpy().argsort(kind='stable')
+    if not crescente:
+        posicoes = posicoes[::-1]
+    inicio = (pagina - 1) * por_pagina
+    trecho = df.iloc[posicoes[inicio:inicio + por_pagina]][colunas]
+    formatadas = {c: format_currency_series(trecho[c]) for c in colunas if c != 'Data'}
+    if 'Data' in colunas:
+        formatadas['Data'] = trecho['Data'].dt.strftime('%d/%m/%Y')
+    return trecho.assign(**formatadas).rename(columns=COLUNAS_DETALHE)
+
+# --- FILA DE CÁLCULOS DAS COMBINAÇÕES ---
+CALCULOS_ATIVOS = ('na fila', 'executando')
+
+@st.cache_resource
+def executor_calculos():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="combinacoes")
+
+@st.cache_resource
+def fila_calculos():
+    # Compartilhada entre sessões e reruns; chave = hash dos parâmetros do cálculo. Sessões que pedem o mesmo
+    # cálculo acompanham o mesmo trabalho, e cancelar ou aceitar só interrompe a busca quando todas concordam
+    return {'trabalhos': {}, 'lock': threading.Lock()}
+
+def executar_calculo(trabalho):
+    if trabalho['parar'].is_set():
+        return
+    trabalho['status'] = 'executando'
+    trabalho['inicio'] = time.time()
+
+    def ao_progredir(etapa, fracao, geracao, residuo, parcial):
+        trabalho['progresso'] = fracao
+        trabalho['melhor'] = parcial
+        # A curva de convergência só ganha um ponto quando o resíduo da etapa muda
+        convergencia = trabalho['convergencia']
+        if not convergencia or convergencia[-1]['Etapa'] != etapa or convergencia[-1]['Resíduo'] != residuo:
+            convergencia.append({'Etapa': etapa, 'Segundos': time.time() - trabalho['inicio'], 'Geração': geracao,
+                                 'Resíduo': residuo})
+
+    try:
+        resultado = gerar_dados_geneticos(**trabalho['parametros'], parar=trabalho['parar'], ao_progredir=ao_progredir,
+                                          aceitar=trabalho['aceitar'])
+        if trabalho['parar'].is_set():
+            trabalho['status'] = 'cancelado'
+        else:
+            trabalho['resultado'] = resultado
+            trabalho['progresso'] = 1.0
+            trabalho['status'] = 'concluído'
+    except Exception as e:
+        trabalho['erro'] = str(e)
+        trabalho['status'] = 'erro'
+    finally:
+        trabalho['fim'] = time.time()
+
+def soltar_sessao(trabalho, sessao):
+    """Tira a sessão do trabalho (chamar com o lock da fila); retorna se ainda há outras sessões à espera dele."""
+    trabalho['sessoes'].discard(sessao)
+    trabalho['aceites'].discard(sessao)
+    # As sessões que restam podem já ter aceitado todas
+    if trabalho['sessoes'] and trabalho['sessoes'] <= trabalho['aceites']:
+        trabalho['aceitar'].set()
+    return bool(trabalho['sessoes'])
+
+def enviar_calculo(valor_alvo_total, drink_pct, pop_size, n_gens, tam_sand, tam_beb, sessao=None, anterior=None,
+                   max_trabalhos=20):
+    """Enfileira o cálculo; os mesmos parâmetros reaproveitam o trabalho em andamento ou o resultado já calculado.
+
+    `anterior` é o trabalho que a sessão acompanhava até agora: ela deixa de contar nele."""
+    parametros = {'valor_alvo_total': round(float(valor_alvo_total), 2), 'drink_pct': drink_pct, 'pop_size': pop_size,
+                  'n_gens': n_gens, 'tam_sand': tam_sand, 'tam_beb': tam_beb}
+    chave = hashlib.sha1(json.dumps(parametros, sort_keys=True).encode()).hexdigest()[:12]
+    fila = fila_calculos()
+    with fila['lock']:
+        trabalho = fila['trabalhos'].get(chave)
+        # Um trabalho interrompido pelo "Aceitar Melhor Atual" guarda só uma combinação parcial: reenviar refaz a busca
+        if trabalho is None or trabalho['status'] in ('cancelado', 'erro') or trabalho['aceitar'].is_set():
+            trabalho = {'id': chave, 'parametros': parametros, 'status': 'na fila', 'progresso': 0.0, 'melhor': None,
+                        'convergencia': [], 'resultado': None, 'erro': None, 'parar': threading.Event(),
+                        'aceitar': threading.Event(), 'sessoes': set(), 'aceites': set(), 'criado': time.time(),
+                        'inicio': None, 'fim': None}
+            fila['trabalhos'][chave] = trabalho
+            # Descarta os trabalhos encerrados mais antigos; os ativos nunca saem da fila
+            encerrados = [k for k, t in fila['trabalhos'].items() if t['status'] not in CALCULOS_ATIVOS]
+            for k in encerrados[:max(len(fila['trabalhos']) - max_trabalhos, 0)]:
+                del fila['trabalhos'][k]
+            executor_calculos().submit(executar_calculo, trabalho)
+        if anterior is not None and anterior is not trabalho:
+            soltar_sessao(anterior, sessao)
+        trabalho['sessoes'].add(sessao)
+    return trabalho
+
+def cancelar_calculo(trabalho, sessao=None):
+    """Tira a sessão do trabalho; a busca só para quando nenhuma outra sessão está à espera dela.
+
+    Retorna False se o trabalho continua para as outras sessões."""
+    with fila_calculos()['lock']:
+        if soltar_sessao(trabalho, sessao):
+            return False
+        trabalho['parar'].set()
+        if trabalho['status'] == 'na fila':
+            trabalho['status'] = 'cancelado'
+            trabalho['fim'] = time.time()
+        return True
+
+def aceitar_calculo(trabalho, sessao=None):
+    """Encerra a busca da etapa atual e fica com a melhor combinação até agora (as bebidas ainda completam o alvo).
+
+    Com outras sessões acompanhando o mesmo trabalho, a busca segue até que todas aceitem."""
+    with fila_calculos()['lock']:
+        trabalho['aceites'].add(sessao)
+        if trabalho['sessoes'] <= trabalho['aceites']:
+            trabalho['aceitar'].set()
+
+def receber_calculo(chave_calculo, chave_resultado):
+    """Leva para a sessão o resultado de um cálculo concluído em segundo plano; avisa de erro ou cancelamento."""
+    trabalho = st.session_state[chave_calculo]
+    if trabalho is None:
+        return
+    if trabalho['status'] == 'concluído':
+        st.session_state[chave_resultado] = trabalho['resultado']
+        if trabalho['aceitar'].is_set():
+            st.caption(f"Melhor combinação aceita após {trabalho['fim'] - trabalho['inicio']:.1f} s, antes do fim da busca.")
+    elif trabalho['status'] == 'erro':
+        st.error(f"Erro no cálculo `{trabalho['id']}`: {trabalho['erro']}")
+    elif trabalho['status'] == 'cancelado':
+        st.info(f"Cálculo `{trabalho['id']}` cancelado.")
+
+@st.experimental_fragment(run_every=1)
+def acompanhar_calculo(chave_calculo):
+    trabalho = st.session_state[chave_calculo]
+    sessao = st.session_state.id_sessao
+    if trabalho['status'] not in CALCULOS_ATIVOS:
+        st.rerun()
+    alvo = trabalho['parametros']['valor_alvo_total']
+    if trabalho['status'] == 'na fila':
+        texto = "aguardando na fila..."
+    else:
+        texto = f"calculando há {time.time() - trabalho['inicio']:.0f} s... {trabalho['progresso']:.0%}"
+    st.progress(trabalho['progresso'], text=f"Cálculo `{trabalho['id']}` ({format_currency(alvo)}): {texto}")
+    if trabalho['melhor']:
+        valor = calculate_combination_value(trabalho['melhor']['sanduiches'], CARDAPIOS["sanduiches"]) + \
+            calculate_combination_value(trabalho['melhor']['bebidas'], CARDAPIOS["bebidas"])
+        st.caption(f"Melhor combinação até agora: {format_currency(valor)} (faltam {format_currency(alvo - valor)}).")
+    if trabalho['convergencia']:
+        # Repete o último ponto no instante atual para a curva em degraus não parar no último ganho
+        curva = pd.DataFrame(list(trabalho['convergencia']))
+        curva = pd.concat([curva, curva.iloc[[-1]].assign(Segundos=time.time() - trabalho['inicio'])], ignore_index=True)
+        grafico = alt.Chart(curva).mark_line(interpolate='step-after', point=True).encode(
+            x=alt.X('Segundos:Q', title='Segundos'),
+            y=alt.Y('Resíduo:Q', title='Falta para o alvo da etapa (R$)'),
+            color=alt.Color('Etapa:N', scale=alt.Scale(domain=['Sanduíches', 'Bebidas'])),
+            tooltip=['Etapa', 'Geração', alt.Tooltip('Segundos:Q', format='.1f'), alt.Tooltip('Resíduo:Q', format=',.2f')]
+        ).properties(height=250, title='Convergência do Algoritmo Genético')
+        st.altair_chart(grafico, use_container_width=True)
+    outras = len(trabalho['sessoes'] - {sessao})
+    if outras:
+        st.caption(f"Este cálculo é compartilhado com {outras} outra(s) sessão(ões) que pediram os mesmos parâmetros: "
+                   "cancelar libera só esta sessão, e aceitar só interrompe a busca quando todas aceitarem.")
+    col1, col2 = st.columns(2)
+    with col1:
+        aceito = sessao in trabalho['aceites']
+        if st.button("✅ Aceite registrado" if aceito else "✅ Aceitar Melhor Atual", key=f"aceitar_{trabalho['id']}",
+                     disabled=aceito or not trabalho['melhor'], use_container_width=True):
+            aceitar_calculo(trabalho, sessao)
+            st.rerun()
+    with col2:
+        if st.button("⏹️ Cancelar Cálculo", key=f"cancelar_{trabalho['id']}", use_container_width=True):
+            if not cancelar_calculo(trabalho, sessao):
+                # O trabalho segue para as outras sessões; nesta ele aparece como cancelado
+                st.session_state[chave_calculo] = {**trabalho, 'status': 'cancelado', 'fim': time.time()}
+            st.rerun()
+    st.caption("Você pode continuar usando as outras abas enquanto o cálculo roda.")
+
+def tabela_combinacoes():
+    """Combinações encontradas nesta sessão (algoritmo genético e decomposição) numa tabela única para exportação."""
+    partes = []
+    for origem, dados in (("Total do Arquivo", st.session_state.resultado_arquivo),
+                          ("Calculadora PIX", st.session_state.resultado_pix)):
+        if not dados:
+            continue
+        for categoria, chave, menu in (("Sanduíches", 'sanduiches', CARDAPIOS["sanduiches"]),
+                                       ("Bebidas", 'bebidas', CARDAPIOS["bebidas"])):
+            itens = dados[chave]
+            partes.append(pd.DataFrame({
+                'Origem': origem, 'Categoria': categoria, 'Produto': list(itens),
+                'Quantidade': list(itens.values()), 'Preço Unitário': [menu[k] for k in itens]
+            }))
+    if st.session_state.resultado_transacoes:
+        produtos = st.session_state.resultado_transacoes['produtos']
+        precos = {**CARDAPIOS["sanduiches"], **CARDAPIOS["bebidas"]}
+        partes.append(produtos[['Categoria', 'Produto', 'Quantidade']].assign(
+            Origem="Transação a Transação", **{'Preço Unitário': produtos['Produto'].map(precos)}))
+    if not partes:
+        return pd.DataFrame()
+    combinacoes = pd.concat(partes, ignore_index=True)
+    combinacoes['Subtotal'] = combinacoes['Quantidade'] * combinacoes['Preço Unitário']
+    return combinacoes[['Origem', 'Categoria', 'Produto', 'Quantidade', 'Preço Unitário', 'Subtotal']]
 
 def renderizar_resultados(dados):
     st.subheader(f"Valor Alvo: {format_currency(dados['alvo'])}")
@@ -415,7 +953,8 @@ def renderizar_resultados(dados):
                                  'Preço Unitário': [CARDAPIOS["sanduiches"][k] for k in dados['sanduiches']],
                                  'Subtotal': [CARDAPIOS["sanduiches"][k]*v for k,v in dados['sanduiches'].items()]})
             df_s = df_s.sort_values('Subtotal', ascending=False)
-            html_s = df_s.style.format({'Qnt':'{:.0f}', 'Preço Unitário':'R$ {:.2f}', 'Subtotal':'R$ {:.2f}'})\
+            df_s = df_s.assign(**{c: format_currency_series(df_s[c]) for c in ['Preço Unitário', 'Subtotal']})
+            html_s = df_s.style.format({'Qnt':'{:.0f}'})\
                 .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
             st.markdown(html_s, unsafe_allow_html=True)
             st.write("")
@@ -429,7 +968,8 @@ def renderizar_resultados(dados):
                                  'Preço Unitário': [CARDAPIOS["bebidas"][k] for k in dados['bebidas']],
                                  'Subtotal': [CARDAPIOS["bebidas"][k]*v for k,v in dados['bebidas'].items()]})
             df_b = df_b.sort_values('Subtotal', ascending=False)
-            html_b = df_b.style.format({'Qnt':'{:.0f}', 'Preço Unitário':'R$ {:.2f}', 'Subtotal':'R$ {:.2f}'})\
+            df_b = df_b.assign(**{c: format_currency_series(df_b[c]) for c in ['Preço Unitário', 'Subtotal']})
+            html_b = df_b.style.format({'Qnt':'{:.0f}'})\
                 .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
             st.markdown(html_b, unsafe_allow_html=True)
             st.write("")
@@ -454,6 +994,32 @@ def renderizar_resultados(dados):
     </div>
     """, unsafe_allow_html=True)
 
+def renderizar_estimativa_produtos(resultado):
+    st.caption(f"⚡ {resultado['transacoes']} transações ({resultado['valores_unicos']} valores distintos) "
+               f"decompostas em {resultado['tempo']:.2f} s.")
+    if resultado['acima_do_limite']:
+        st.caption(f"{resultado['acima_do_limite']} transação(ões) acima de {format_currency(VALOR_MAXIMO_DECOMPOSICAO)} "
+                   f"({format_currency(resultado['valor_acima_do_limite'])}) ficaram fora da decomposição.")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Valor das Transações", format_currency(resultado['valor_total']))
+    with col2:
+        st.metric("Valor Explicado", format_currency(resultado['valor_explicado']))
+    with col3:
+        st.metric("Itens Estimados", f"{int(resultado['produtos']['Quantidade'].sum())}")
+
+    df_p = resultado['produtos']
+    if df_p.empty:
+        st.warning("Sem itens")
+        return
+    html_p = df_p.assign(**{'Receita Estimada': format_currency_series(df_p['Receita Estimada'])})\
+        .style.format({'Quantidade': '{:.0f}'})\
+        .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+    st.markdown(html_p, unsafe_allow_html=True)
+    st.write("")
+    st.altair_chart(create_altair_chart(df_p, 'bar', 'Produto', 'Quantidade', 'Categoria', title='Unidades Estimadas por Produto'),
+                    use_container_width=True)
+
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
     page_title=CONFIG["page_title"],
@@ -618,17 +1184,47 @@ if 'resultado_arquivo' not in st.session_state:
     st.session_state.resultado_arquivo = None
 if 'resultado_pix' not in st.session_state:
     st.session_state.resultado_pix = None
+if 'calculo_arquivo' not in st.session_state:
+    st.session_state.calculo_arquivo = None
+if 'calculo_pix' not in st.session_state:
+    st.session_state.calculo_pix = None
+if 'id_sessao' not in st.session_state:
+    # Identifica a sessão nos cálculos compartilhados (fila_calculos)
+    st.session_state.id_sessao = uuid.uuid4().hex
+if 'resultado_transacoes' not in st.session_state:
+    st.session_state.resultado_transacoes = None
+if 'tarefa_ingestao' not in st.session_state:
+    st.session_state.tarefa_ingestao = None
+if 'planilha_ativa' not in st.session_state:
+    st.session_state.planilha_ativa = False
+if 'relatorio_pdf' not in st.session_state:
+    st.session_state.relatorio_pdf = None
+if 'equipe' not in st.session_state:
+    st.session_state.equipe = load_equipe()
+if st.session_state.tarefa_ingestao is None and caixa_entrada()['resultado'] is not None:
+    st.session_state.tarefa_ingestao = caixa_entrada()
+    st.session_state.versao_caixa = caixa_entrada()['versao']
+
+# Publica o resultado da ingestão em segundo plano assim que ela termina, em qualquer aba
+resultado_atual = resultado_da_sessao(st.session_state.tarefa_ingestao) if st.session_state.tarefa_ingestao else None
+if resultado_atual is not None and st.session_state.uploaded_data is not resultado_atual['transacoes']:
+    if not resultado_atual['transacoes'].empty:
+        st.session_state.uploaded_data = resultado_atual['transacoes']
+        st.session_state.vendas_data = resultado_atual['vendas']
+        st.session_state.total_vendas = st.session_state.vendas_data['Valor'].sum()
 
 # --- INTERFACE PRINCIPAL ---
 
-def get_img_as_base64(file_path):
+@lru_cache(maxsize=2)
+def get_img_as_base64(file_path, modificado_em=None):
+    # Em cache pela data de modificação: o rerun completo não relê nem recodifica o logo
     with open(file_path, "rb") as f:
         data = f.read()
     return base64.b64encode(data).decode()
 
 try:
     if os.path.exists(CONFIG["logo_path"]):
-        img_base64 = get_img_as_base64(CONFIG["logo_path"])
+        img_base64 = get_img_as_base64(CONFIG["logo_path"], os.path.getmtime(CONFIG["logo_path"]))
         st.markdown(
             f"""
             <div class="logo-container">
@@ -686,207 +1282,418 @@ with st.sidebar:
     
     st.info("Lembre-se: As combinações são aproximações heurísticas.")
 
-# --- MENU DE NAVEGAÇÃO ESTILIZADO (SEM "RECEBIMENTOS") ---
-menu_opcoes = ["📈 Resumo das Vendas", "🧩 Detalhes das Combinações", "💸 Calculadora PIX"]
+    st.divider()
+    monitorar_caixa_entrada()
+
+    st.divider()
+    st.subheader("📤 Exportação")
+    if st.button("Gerar Planilha Excel", use_container_width=True):
+        st.session_state.planilha_ativa = True
+    if st.session_state.planilha_ativa:
+        with st.spinner("Gerando planilha..."):
+            planilha = planilha_em_cache(st.session_state.df_receipts, st.session_state.uploaded_data,
+                                         tabela_combinacoes())
+        st.download_button("📥 Baixar Planilha", data=planilha, file_name="clips_burger.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           use_container_width=True)
+
+# --- MENU DE NAVEGAÇÃO ESTILIZADO ---
+menu_opcoes = ["📈 Resumo das Vendas", "🧩 Detalhes das Combinações", "💸 Calculadora PIX", "💰 Recebimentos",
+               "🧾 Conciliação"]
 escolha_menu = st.radio("Navegação", menu_opcoes, horizontal=True, label_visibility="collapsed", key="nav_menu")
 
 # LINHA HORIZONTAL 2 (DIVISOR INFERIOR) - SIMÉTRICO
 #st.markdown('<div style="border-top: 1px solid rgba(0,0,0,0.1); margin-top: 20px; margin-bottom: 20px;"></div>', unsafe_allow_html=True)
 
-# --- CONTEÚDO DAS ABAS ---
+# --- SEÇÕES DA PÁGINA (FRAGMENTOS) ---
+# Cada seção roda como fragmento: um widget dentro dela reexecuta só a seção, não o script inteiro.
+# Widgets fora delas (barra lateral, navegação, upload) continuam disparando o rerun completo.
+@st.experimental_fragment
+def secao_resumo_vendas(tarefa):
+    try:
+        if tarefa['erro']:
+            st.error(f"Erro: {tarefa['erro']}")
+            return
 
-if escolha_menu == "📈 Resumo das Vendas":
-    st.header("📤 Upload de Dados")
-    arquivo = st.file_uploader("Envie o arquivo de transações (.csv ou .xlsx)", 
-                             type=["csv", "xlsx"])
-    
-    if arquivo:
-        try:
-            with st.spinner("Processando arquivo..."):
-                if arquivo.name.endswith(".csv"):
-                    try:
-                        df = pd.read_csv(arquivo, sep=';', encoding='utf-8', dtype=str)
-                    except pd.errors.ParserError:
-                        arquivo.seek(0)
-                        try:
-                            df = pd.read_csv(arquivo, sep=',', encoding='utf-8', dtype=str)
-                        except:
-                            arquivo.seek(0)
-                            df = pd.read_csv(arquivo, engine='python', dtype=str)
+        resultado = resultado_da_sessao(tarefa)
+        df, vendas, grade_horaria = resultado['transacoes'], resultado['vendas'], resultado['grade_horaria']
+        if tarefa is caixa_entrada():
+            st.caption(f"📥 Dados importados automaticamente da pasta `{tarefa['pasta']}`.")
+        if df.empty:
+            st.warning("Nenhuma transação válida encontrada.")
+            return
+
+        total_vendas = vendas['Valor'].sum()
+
+        st.header("📊 Visualização de Dados")
+
+        st.subheader("Total de Vendas por Forma de Pagamento")
+        bar_chart = create_altair_chart(
+            vendas, 'bar', 'Forma', 'Valor', 'Forma',
+            title=''
+        ).properties(
+            width=800,
+            height=500
+        )
+        st.altair_chart(bar_chart, use_container_width=True)
+
+        nao_mapeadas = resultado['nao_mapeadas']
+        if not nao_mapeadas.empty:
+            st.warning(f"{int(nao_mapeadas['Transacoes'].sum())} transações "
+                       f"({format_currency(nao_mapeadas['Valor'].sum())}) têm forma de pagamento não reconhecida "
+                       f"e ficaram fora dos totais. Inclua-as em `{CONFIG['payment_map_file']}`.")
+            with st.expander("Formas de pagamento não reconhecidas"):
+                html_nm = nao_mapeadas.style.format({'Valor': format_currency})\
+                    .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+                st.markdown(html_nm, unsafe_allow_html=True)
+
+        st.subheader("Vendas por Hora e Dia da Semana")
+        if grade_horaria.empty:
+            st.caption("O arquivo não possui data/hora das transações.")
+        else:
+            col1, col2 = st.columns([0.6, 0.4])
+            with col1:
+                formas_mapa = st.multiselect("Formas de pagamento", options=vendas['Forma'].tolist(),
+                                             default=vendas['Forma'].tolist(), key="formas_mapa")
+            with col2:
+                metrica_mapa = st.selectbox("Métrica", ["Transações", "Faturamento", "Ticket Médio"], key="metrica_mapa")
+            st.altair_chart(criar_mapa_calor(grade_horaria, formas_mapa, metrica_mapa), use_container_width=True)
+
+        st.header("⚙️ Parâmetros Financeiros")
+        col1, col2 = st.columns(2)
+        with col1:
+            opcao_inss = st.selectbox("Contribuição Patronal (INSS)", list(OPCOES_INSS_PATRONAL))
+            aliquota_inss = OPCOES_INSS_PATRONAL[opcao_inss]
+        with col2:
+            custo_contadora = st.number_input("Custo com Contadora (R$)", value=316.0, step=10.0)
+
+        with st.expander("👥 Equipe (CLT)"):
+            equipe = st.data_editor(
+                st.session_state.equipe, key="editor_equipe", num_rows="dynamic", hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Salário': st.column_config.NumberColumn(format="R$ %.2f", min_value=0.0),
+                    'Admissão': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                    'Desligamento': st.column_config.DateColumn(format="DD/MM/YYYY")
+                })
+            if st.button("💾 Salvar Equipe"):
+                st.session_state.equipe = equipe
+                save_equipe(equipe)
+
+        with st.expander("💳 Taxas da Adquirente (MDR)"):
+            tabela_taxas = st.data_editor(
+                tabela_taxas_padrao(), key="tabela_taxas", hide_index=True, use_container_width=True,
+                disabled=['Forma'])
+
+        df_liquido = aplicar_taxas_adquirente(df, tabela_taxas)
+        vendas, agenda_liquidacao = resumir_liquidacao(df_liquido)
+        taxas_adquirente = vendas['Taxa'].sum()
+
+        st.header("💰 Resultados Financeiros")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Faturamento Bruto", format_currency(total_vendas))
+        with col2:
+            if 'Data' in df.columns and df['Data'].notna().any():
+                mes_referencia = df['Data'].max().to_period('M')
+            else:
+                mes_referencia = pd.Timestamp.today().to_period('M')
+            aliquota_simples = aliquota_do_mes(st.session_state.df_receipts, mes_referencia, total_vendas)
+            imposto_simples = total_vendas * aliquota_simples
+            st.metric(f"Imposto Simples ({format_percent(aliquota_simples)})", format_currency(imposto_simples),
+                      help=f"Alíquota efetiva do Anexo I para {mes_referencia.strftime('%m/%Y')}, calculada pela RBT12")
+        with col3:
+            inicio_folha = mes_referencia
+            if not st.session_state.df_receipts.empty:
+                inicio_folha = min(inicio_folha, pd.to_datetime(st.session_state.df_receipts['Data']).min().to_period('M'))
+            folha = cronograma_folha(equipe, inicio_folha, max(mes_referencia, pd.Timestamp.today().to_period('M')), aliquota_inss)
+            custo_funcionario = folha.loc[folha['Mês'] == mes_referencia, 'Total'].sum()
+            st.metric("Custo Funcionários CLT", format_currency(custo_funcionario),
+                      help=f"Folha provisionada de {mes_referencia.strftime('%m/%Y')}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Taxas da Adquirente", format_currency(taxas_adquirente))
+        with col2:
+            st.metric("Receita Líquida", format_currency(total_vendas - taxas_adquirente))
+
+        total_custos = imposto_simples + custo_funcionario + custo_contadora + taxas_adquirente
+        lucro_estimado = total_vendas - total_custos
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Total de Custos", format_currency(total_custos))
+        with col2:
+            st.metric("Lucro Estimado", format_currency(lucro_estimado))
+
+        with st.expander("🧪 Simulação de Cenários"):
+            st.caption("Todas as combinações da grade são calculadas de uma vez; escolha dois eixos para visualizar.")
+            pontos = st.slider("Pontos por eixo", 3, 15, 5, key="cenarios_pontos")
+            eixos = {}
+            cols = st.columns(len(EIXOS_CENARIOS))
+            for col, (nome, (rotulo, faixa, inteiro)) in zip(cols, EIXOS_CENARIOS.items()):
+                with col:
+                    minimo, maximo = st.slider(rotulo, min_value=0 if inteiro else 0.0,
+                                               max_value=10 if inteiro else faixa[1] * 2,
+                                               value=faixa, key=f"cenarios_{nome}")
+                if inteiro:
+                    eixos[nome] = np.arange(minimo, maximo + 1)
                 else:
-                    df = pd.read_excel(arquivo, dtype=str)
-                
-                required_cols = ['Tipo', 'Bandeira', 'Valor']
-                if not all(col in df.columns for col in required_cols):
-                    st.error(f"Erro: O arquivo precisa conter as colunas: {', '.join(required_cols)}")
-                    st.stop()
-
-                df['Tipo'] = df['Tipo'].str.lower().str.strip().fillna('desconhecido')
-                df['Bandeira'] = df['Bandeira'].str.lower().str.strip().fillna('desconhecida')
-                df['Valor'] = pd.to_numeric(
-                    df['Valor'].str.replace('.', '').str.replace(',', '.'), 
-                    errors='coerce')
-                df = df.dropna(subset=['Valor'])
-                
-                df['Forma'] = (df['Tipo'] + ' ' + df['Bandeira']).map(FORMAS_PAGAMENTO)
-                df = df.dropna(subset=['Forma'])
-                
-                if df.empty:
-                    st.warning("Nenhuma transação válida encontrada.")
-                    st.stop()
-
-                vendas = df.groupby('Forma')['Valor'].sum().reset_index()
-                total_vendas = vendas['Valor'].sum()
-                
-                st.session_state.uploaded_data = df
-                st.session_state.vendas_data = vendas
-                st.session_state.total_vendas = total_vendas
-            
-            st.header("📊 Visualização de Dados")
-            
-            st.subheader("Total de Vendas por Forma de Pagamento")
-            bar_chart = create_altair_chart(
-                vendas, 'bar', 'Forma', 'Valor', 'Forma',
-                title=''
-            ).properties(
-                width=800,
-                height=500
-            )
-            st.altair_chart(bar_chart, use_container_width=True)
-            
-            st.header("⚙️ Parâmetros Financeiros")
+                    eixos[nome] = np.linspace(minimo, maximo, pontos)
+
             col1, col2 = st.columns(2)
             with col1:
-                salario_minimo = st.number_input("Salário Mínimo (R$)", value=1518.0, step=50.0)
+                eixo_x = st.selectbox("Eixo horizontal", list(EIXOS_CENARIOS), index=0,
+                                      format_func=lambda n: EIXOS_CENARIOS[n][0], key="cenarios_x")
             with col2:
-                custo_contadora = st.number_input("Custo com Contadora (R$)", value=316.0, step=10.0)
-            
-            st.header("💰 Resultados Financeiros")
-            
+                eixo_y = st.selectbox("Eixo vertical", [n for n in EIXOS_CENARIOS if n != eixo_x], index=0,
+                                      format_func=lambda n: EIXOS_CENARIOS[n][0], key="cenarios_y")
+
+            taxas_fixas = df_liquido['Forma'].map(tabela_taxas.set_index('Forma')['Tarifa Fixa (R$)']).fillna(0).sum()
+            lucros = simular_cenarios(total_vendas, taxas_adquirente - taxas_fixas, taxas_fixas, eixos, aliquota_inss)
+            folha_mes = folha[folha['Mês'] == mes_referencia]
+            ativos = int(folha_mes['Funcionários'].sum())
+            valores_base = {'aliquota': aliquota_simples * 100,
+                            'salario': folha_mes['Salários'].sum() / ativos if ativos else PARAMETROS_FINANCEIROS["salario_padrao"],
+                            'funcionarios': ativos, 'contadora': custo_contadora, 'fator_mdr': 1.0}
+            sensibilidade = fatiar_cenarios(lucros, eixos, eixo_x, eixo_y, valores_base)
+
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Faturamento Bruto", format_currency(total_vendas))
+                st.metric("Cenários Avaliados", f"{lucros.size:,}".replace(",", "."))
             with col2:
-                imposto_simples = total_vendas * 0.06
-                st.metric("Imposto Simples (6%)", format_currency(imposto_simples))
+                st.metric("Cenários com Lucro", f"{(lucros > 0).mean():.0%}")
             with col3:
-                fgts = salario_minimo * 0.08
-                ferias = (salario_minimo / 12) * (4/3)
-                decimo_terceiro = salario_minimo / 12
-                custo_funcionario = salario_minimo + fgts + ferias + decimo_terceiro
-                st.metric("Custo Funcionário CLT", format_currency(custo_funcionario))
-            
-            total_custos = imposto_simples + custo_funcionario + custo_contadora
-            lucro_estimado = total_vendas - total_custos
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Total de Custos", format_currency(total_custos))
-            with col2:
-                st.metric("Lucro Estimado", format_currency(lucro_estimado))
-            
-            st.header("🔍 Detalhamento")
-            
-            tab_detalhes1, tab_detalhes2, tab_detalhes3 = st.tabs([
-                "📝 Composição de Custos", 
-                "📚 Explicação dos Cálculos",
-                "🍰 Gráfico de Composição"
-            ])
-            
-            with tab_detalhes1:
-                st.subheader("Composição dos Custos")
-                st.markdown(f"""
-                - **Imposto Simples Nacional (6%)**: {format_currency(imposto_simples)}
-                - **Custo Funcionário CLT**: {format_currency(custo_funcionario)}
-                - **Custo Contadora**: {format_currency(custo_contadora)}
-                """)
-            
-            with tab_detalhes2:
-                st.subheader("Fórmulas Utilizadas")
-                st.markdown("""
-                **1. Imposto Simples Nacional** `Faturamento Bruto × 6%`  
-                **2. Custo Funcionário CLT** `Salário + FGTS (8%) + Férias (1 mês + 1/3) + 13º Salário`  
-                **3. Total de Custos** `Imposto + Funcionário + Contadora`  
-                **4. Lucro Estimado** `Faturamento Bruto - Total de Custos`
-                """)
-            
-            with tab_detalhes3:
-                st.subheader("Composição dos Custos")
-                custos_df = pd.DataFrame({
-                    'Item': ['Impostos', 'Funcionário', 'Contadora'],
-                    'Valor': [imposto_simples, custo_funcionario, custo_contadora]
-                })
-                
-                graf_composicao = alt.Chart(custos_df).mark_arc().encode(
-                    theta='Valor',
-                    color='Item',
-                    tooltip=['Item', alt.Tooltip('Valor', format='$.2f')]
-                ).properties(
-                    width=600,
-                    height=500
+                st.metric("Pior Cenário", format_currency(lucros.min()))
+
+            df_mapa = sensibilidade.stack().rename('Lucro').reset_index()
+            df_mapa.columns = ['Y', 'X', 'Lucro']
+            mapa_cenarios = alt.Chart(df_mapa).mark_rect().encode(
+                x=alt.X('X:O', title=EIXOS_CENARIOS[eixo_x][0], axis=alt.Axis(format='.2f')),
+                y=alt.Y('Y:O', title=EIXOS_CENARIOS[eixo_y][0], sort='descending', axis=alt.Axis(format='.2f')),
+                color=alt.Color('Lucro:Q', scale=alt.Scale(scheme='redyellowgreen', domainMid=0)),
+                tooltip=['X', 'Y', alt.Tooltip('Lucro:Q', format=',.2f')]
+            ).properties(height=350)
+            st.altair_chart(mapa_cenarios, use_container_width=True)
+            tabela_sens = sensibilidade.copy()
+            tabela_sens.index = [f"{v:,.2f}" for v in tabela_sens.index]
+            tabela_sens.columns = [f"{v:,.2f}" for v in tabela_sens.columns]
+            html_sens = tabela_sens.style.format(format_currency)\
+                .set_table_styles(get_global_centered_styles()).to_html()
+            st.markdown(html_sens, unsafe_allow_html=True)
+
+        st.header("🔍 Detalhamento")
+
+        tab_detalhes1, tab_detalhes2, tab_detalhes3, tab_detalhes4, tab_detalhes5, tab_detalhes6, tab_detalhes7 = st.tabs([
+            "📝 Composição de Custos", 
+            "📚 Explicação dos Cálculos",
+            "🍰 Gráfico de Composição",
+            "📅 Liquidação",
+            "🏛️ Simples Nacional",
+            "👥 Folha de Pagamento",
+            "📈 DRE Mensal"
+        ])
+
+        eh_pix = vendas['Forma'] == 'PIX'
+        taxa_cartao = vendas.loc[~eh_pix, 'Taxa'].sum() / vendas.loc[~eh_pix, 'Valor'].sum() if (~eh_pix).any() else 0.0
+        taxa_pix = vendas.loc[eh_pix, 'Taxa'].sum() / vendas.loc[eh_pix, 'Valor'].sum() if eh_pix.any() else 0.0
+        dre, meses_recalculados = dre_mensal(st.session_state.df_receipts, equipe, aliquota_inss, custo_contadora,
+                                             taxa_cartao, taxa_pix)
+
+        with tab_detalhes1:
+            st.subheader("Composição dos Custos")
+            st.markdown(f"""
+            - **Imposto Simples Nacional ({format_percent(aliquota_simples)})**: {format_currency(imposto_simples)}
+            - **Custo Funcionários CLT**: {format_currency(custo_funcionario)}
+            - **Custo Contadora**: {format_currency(custo_contadora)}
+            - **Taxas da Adquirente**: {format_currency(taxas_adquirente)}
+            """)
+
+        with tab_detalhes2:
+            st.subheader("Fórmulas Utilizadas")
+            st.markdown("""
+            **1. Imposto Simples Nacional** `Faturamento Bruto × Alíquota Efetiva`, com `Alíquota Efetiva = (RBT12 × Alíquota Nominal − Parcela a Deduzir) / RBT12` (Anexo I) e RBT12 = receita dos 12 meses anteriores  
+            **2. Custo Funcionários CLT** `Σ (Salário + FGTS (8%) + INSS Patronal + Férias (1 mês + 1/3) + 13º Salário)` da equipe, proporcional aos dias trabalhados no mês  
+            **3. Taxas da Adquirente** `Σ (Valor × Percentual + Tarifa Fixa)` por transação  
+            **4. Total de Custos** `Imposto + Funcionário + Contadora + Taxas`  
+            **5. Lucro Estimado** `Faturamento Bruto - Total de Custos`
+            """)
+
+        with tab_detalhes3:
+            st.subheader("Composição dos Custos")
+            custos_df = pd.DataFrame({
+                'Item': ['Impostos', 'Funcionário', 'Contadora', 'Taxas Adquirente'],
+                'Valor': [imposto_simples, custo_funcionario, custo_contadora, taxas_adquirente]
+            })
+
+            graf_composicao = alt.Chart(custos_df).mark_arc().encode(
+                theta='Valor',
+                color='Item',
+                tooltip=['Item', alt.Tooltip('Valor', format='$.2f')]
+            ).properties(
+                width=600,
+                height=500
+            )
+            st.altair_chart(graf_composicao, use_container_width=True)
+
+        with tab_detalhes5:
+            st.subheader("Histórico do Simples Nacional")
+            historico_simples = tabela_simples_mensal(st.session_state.df_receipts)
+            if historico_simples.empty:
+                st.info("Sem recebimentos registrados para calcular o histórico.")
+            else:
+                st.caption("Meses com menos de 12 meses de histórico usam a média dos meses anteriores × 12.")
+                html_simples = historico_simples.style.format({
+                    'Mês': lambda p: p.strftime('%m/%Y'), 'Faturamento': format_currency, 'RBT12': format_currency,
+                    'Alíquota Nominal': '{:.2%}', 'Alíquota Efetiva': '{:.2%}', 'Imposto': format_currency
+                }).set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+                st.markdown(html_simples, unsafe_allow_html=True)
+
+        with tab_detalhes6:
+            st.subheader("Folha de Pagamento Provisionada")
+            colunas_folha = ['Salários', 'FGTS', 'INSS Patronal', 'Férias + 1/3', '13º Salário', 'Total']
+            html_folha = folha.style.format({'Mês': lambda p: p.strftime('%m/%Y'), **{c: format_currency for c in colunas_folha}})\
+                .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+            st.markdown(html_folha, unsafe_allow_html=True)
+
+        with tab_detalhes7:
+            st.subheader("Demonstrativo de Resultado Mensal")
+            if dre.empty:
+                st.info("Sem recebimentos registrados para montar o DRE.")
+            else:
+                st.caption(f"Taxas MDR estimadas com as taxas médias do extrato atual (Cartão {format_percent(taxa_cartao)}, "
+                           f"PIX {format_percent(taxa_pix)}). {meses_recalculados} mês(es) recalculado(s) nesta execução.")
+                df_tendencia = dre.assign(Mês=dre['Mês'].dt.to_timestamp()).melt(
+                    id_vars='Mês', value_vars=['Faturamento', 'Custos', 'Lucro'], var_name='Série', value_name='Valor')
+                graf_dre = alt.Chart(df_tendencia).mark_line(point=True).encode(
+                    x=alt.X('yearmonth(Mês):T', title='Mês'),
+                    y=alt.Y('Valor:Q', title='R$'),
+                    color=alt.Color('Série:N', scale=alt.Scale(domain=['Faturamento', 'Custos', 'Lucro'],
+                                                               range=['steelblue', '#f97316', '#10b981'])),
+                    tooltip=[alt.Tooltip('yearmonth(Mês):T', title='Mês'), 'Série', alt.Tooltip('Valor:Q', format=',.2f')]
+                ).properties(height=350)
+                st.altair_chart(graf_dre, use_container_width=True)
+                colunas_dre = ['Faturamento', 'Simples', 'Taxas MDR', 'Folha', 'Contadora', 'Custos', 'Lucro']
+                html_dre = dre.style.format({'Mês': lambda p: p.strftime('%m/%Y'), 'Margem': format_percent,
+                                             **{c: format_currency for c in colunas_dre}}, na_rep='-')\
+                    .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+                st.markdown(html_dre, unsafe_allow_html=True)
+
+        with tab_detalhes4:
+            st.subheader("Agenda de Recebimentos")
+            df_agenda = agenda_liquidacao.rename(columns={'Liquidacao': 'Data Prevista', 'Liquido': 'Valor Líquido'})
+            html_agenda = df_agenda.style.format({'Data Prevista': '{:%d/%m/%Y}', 'Valor Líquido': format_currency})\
+                .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+            st.markdown(html_agenda, unsafe_allow_html=True)
+
+        st.header("📑 Relatório")
+        detalhado = st.checkbox("Incluir listagem completa de transações e recebimentos diários",
+                                key="relatorio_detalhado")
+        entradas_relatorio = {
+            'df': df_liquido if detalhado else None, 'vendas': vendas, 'total_vendas': total_vendas,
+            'imposto_simples': imposto_simples, 'custo_funcionario': custo_funcionario, 'custo_contadora': custo_contadora,
+            'total_custos': total_custos, 'lucro_estimado': lucro_estimado, 'taxas_adquirente': taxas_adquirente,
+            'aliquota_simples': aliquota_simples, 'historico_simples': tabela_simples_mensal(st.session_state.df_receipts),
+            'folha_pagamento': folha, 'dre': dre, 'recebimentos': st.session_state.df_receipts if detalhado else None
+        }
+        if st.button("Gerar Relatório PDF"):
+            with st.spinner("Gerando relatório..."):
+                st.session_state.relatorio_pdf = {'assinatura': hash_entradas(entradas_relatorio),
+                                                  'pdf': relatorio_pdf_em_cache(**entradas_relatorio)}
+        relatorio = st.session_state.relatorio_pdf
+        # O PDF gerado só vale para as entradas do clique; qualquer mudança pede um novo clique
+        if relatorio is not None and relatorio['assinatura'] == hash_entradas(entradas_relatorio):
+            st.download_button("📥 Baixar Relatório PDF", data=relatorio['pdf'], file_name="relatorio_clips_burger.pdf",
+                               mime="application/pdf", use_container_width=True)
+        elif relatorio is not None:
+            st.caption("Os dados ou parâmetros mudaram desde a geração do relatório; clique em gerar novamente.")
+
+        with st.expander("🗂️ Relatórios Mensais em Lote"):
+            st.caption(f"Gera um PDF para cada mês do histórico de recebimentos em `{CONFIG['reports_dir']}`, "
+                       "com os parâmetros acima. Meses cujas entradas não mudaram desde a última execução são pulados. "
+                       "Fora do app: `python relatorio_lote.py --help`.")
+            if st.button("Gerar Relatórios de Todos os Meses", use_container_width=True):
+                progresso = st.progress(0.0, text="Calculando entradas dos relatórios...")
+                lote = gerar_relatorios_mensais(
+                    st.session_state.df_receipts, equipe, CONFIG["reports_dir"], aliquota_inss=aliquota_inss,
+                    custo_contadora=custo_contadora, taxa_cartao=taxa_cartao, taxa_pix=taxa_pix,
+                    logo_path=CONFIG["logo_path"],
+                    ao_concluir=lambda n, total, mes: progresso.progress(n / total, text=f"{n}/{total} · {mes}")
                 )
-                st.altair_chart(graf_composicao, use_container_width=True)
-            
-            st.header("📑 Relatório")
-            if st.button("Gerar Relatório PDF"):
-                with st.spinner("Gerando relatório..."):
-                    pdf_buffer = create_pdf_report(
-                        df, vendas, total_vendas, imposto_simples, custo_funcionario, 
-                        custo_contadora, total_custos, lucro_estimado, CONFIG["logo_path"]
-                    )
-                    b64_pdf = base64.b64encode(pdf_buffer.getvalue()).decode()
-                    pdf_display = f'<a href="data:application/pdf;base64,{b64_pdf}" download="relatorio_clips_burger.pdf">📥 Clique aqui para baixar o Relatório PDF</a>'
-                    st.markdown(pdf_display, unsafe_allow_html=True)
-                    st.success("Relatório gerado com sucesso!")
-            
-        except Exception as e:
-            st.error(f"Ocorreu um erro ao processar o arquivo: {str(e)}")
-            st.exception(e)
-    else:
-        st.info("Aguardando upload do arquivo de transações.")
+                progresso.empty()
+                st.success(f"{len(lote['gerados'])} relatório(s) gerado(s) e {len(lote['inalterados'])} sem alteração "
+                           f"em {lote['tempo']:.1f}s.")
+                for mes, erro in lote['erros'].items():
+                    st.error(f"{mes}: {erro}")
 
-elif escolha_menu == "🧩 Detalhes das Combinações":
+    except Exception as e:
+        st.error(f"Ocorreu um erro ao processar o arquivo: {str(e)}")
+        st.exception(e)
+
+
+@st.experimental_fragment
+def secao_combinacoes(drink_percentage, population_size, generations, tamanho_combinacao_sanduiches, tamanho_combinacao_bebidas):
     st.header("🧩 Análise de Combinações")
-    
+
     if st.session_state.vendas_data is not None:
         vendas = st.session_state.vendas_data
-        total_vendas = st.session_state.total_vendas
-        
-        forma_selecionada = st.selectbox(
-            "Selecione a forma de pagamento",
-            options=vendas['Forma'].tolist(),
-            format_func=lambda x: f"{x} ({format_currency(vendas.loc[vendas['Forma'] == x, 'Valor'].iloc[0])})"
-        )
-        
-        valor_selecionado = vendas.loc[vendas['Forma'] == forma_selecionada, 'Valor'].iloc[0]
-        
-        # Botão para calcular
-        if st.button("🔎 Analisar Combinação (Arquivo)", use_container_width=True):
-            with st.spinner("Calculando a melhor combinação..."):
-                dados = gerar_dados_geneticos(
-                    valor_selecionado, 
-                    drink_percentage, 
-                    population_size, 
-                    generations, 
-                    tamanho_combinacao_sanduiches, 
-                    tamanho_combinacao_bebidas
+
+        modo_analise = st.radio("Modo de análise", ["Total por Forma", "Transação a Transação"],
+                                horizontal=True, key="modo_analise")
+
+        if modo_analise == "Transação a Transação":
+            df_transacoes = st.session_state.uploaded_data
+            formas_escolhidas = st.multiselect("Formas de pagamento", options=vendas['Forma'].tolist(),
+                                               default=vendas['Forma'].tolist())
+            if st.button("🔎 Estimar Produtos Vendidos", use_container_width=True):
+                with st.spinner("Decompondo transações..."):
+                    valores = df_transacoes.loc[df_transacoes['Forma'].isin(formas_escolhidas), 'Valor'].to_numpy()
+                    st.session_state.resultado_transacoes = decompor_transacoes(valores, drink_percentage)
+
+            if st.session_state.resultado_transacoes:
+                st.divider()
+                renderizar_estimativa_produtos(st.session_state.resultado_transacoes)
+        else:
+            forma_selecionada = st.selectbox(
+                "Selecione a forma de pagamento",
+                options=vendas['Forma'].tolist(),
+                format_func=lambda x: f"{x} ({format_currency(vendas.loc[vendas['Forma'] == x, 'Valor'].iloc[0])})"
+            )
+
+            valor_selecionado = vendas.loc[vendas['Forma'] == forma_selecionada, 'Valor'].iloc[0]
+
+            # Botão para calcular: o cálculo roda em segundo plano e é acompanhado abaixo da seção
+            if st.button("🔎 Analisar Combinação (Arquivo)", use_container_width=True):
+                st.session_state.calculo_arquivo = enviar_calculo(
+                    valor_selecionado,
+                    drink_percentage,
+                    population_size,
+                    generations,
+                    tamanho_combinacao_sanduiches,
+                    tamanho_combinacao_bebidas,
+                    sessao=st.session_state.id_sessao,
+                    anterior=st.session_state.calculo_arquivo
                 )
-                st.session_state.resultado_arquivo = dados
-        
-        # Exibe o resultado
-        if st.session_state.resultado_arquivo:
-            st.divider()
-            renderizar_resultados(st.session_state.resultado_arquivo)
-        
+                st.rerun()
+            receber_calculo('calculo_arquivo', 'resultado_arquivo')
+
+            # Exibe o resultado
+            if st.session_state.resultado_arquivo:
+                st.divider()
+                renderizar_resultados(st.session_state.resultado_arquivo)
+
     else:
         st.info("Faça o upload de dados na aba 'Resumo das Vendas' para visualizar possíveis combinações.")
 
-elif escolha_menu == "💸 Calculadora PIX":
+
+@st.experimental_fragment
+def secao_calculadora_pix(drink_percentage, population_size, generations, tamanho_combinacao_sanduiches, tamanho_combinacao_bebidas):
     st.header("💸 Calculadora Rápida (PIX/Manual)")
     st.markdown("Use esta aba para analisar um valor específico de PIX recebido, sem precisar subir planilha.")
-    
+
     col_input, col_action = st.columns([0.4, 0.6])
-    
+
     with col_input:
         valor_pix_input = st.number_input(
             "Digite o Valor do PIX recebido (R$):", 
@@ -895,31 +1702,234 @@ elif escolha_menu == "💸 Calculadora PIX":
             format="%.2f",
             help="Insira o valor exato que caiu na conta."
         )
-    
+
     with col_action:
         st.write("") # Espaço para alinhar
         st.write("")
         # Botão para calcular
         if st.button("🚀 Calcular Combinação PIX", type="primary", use_container_width=True):
             if valor_pix_input > 0:
-                with st.spinner("Calculando a melhor combinação..."):
-                    dados = gerar_dados_geneticos(
-                        valor_pix_input, 
-                        drink_percentage, 
-                        population_size, 
-                        generations, 
-                        tamanho_combinacao_sanduiches, 
-                        tamanho_combinacao_bebidas
-                    )
-                    st.session_state.resultado_pix = dados
+                st.session_state.calculo_pix = enviar_calculo(
+                    valor_pix_input,
+                    drink_percentage,
+                    population_size,
+                    generations,
+                    tamanho_combinacao_sanduiches,
+                    tamanho_combinacao_bebidas,
+                    sessao=st.session_state.id_sessao,
+                    anterior=st.session_state.calculo_pix
+                )
+                st.rerun()
             else:
                 st.error("Por favor, insira um valor maior que zero.")
+    receber_calculo('calculo_pix', 'resultado_pix')
 
     # EXIBE O RESULTADO QUE ESTÁ NA MEMÓRIA
     if st.session_state.resultado_pix:
         st.divider()
         renderizar_resultados(st.session_state.resultado_pix)
 
+
+@st.experimental_fragment
+def secao_recebimentos():
+    st.header("💰 Cadastro e Análise de Recebimentos")
+
+    with st.expander("➕ Adicionar Novo Registro", expanded=st.session_state.df_receipts.empty):
+        with st.form("add_receipt_form"):
+            data = st.date_input("Data*", value=datetime.now())
+            st.write("**Valores por Forma de Pagamento**")
+            cols = st.columns(3)
+            with cols[0]:
+                dinheiro = st.number_input("Dinheiro (R$)*", min_value=0.0, step=10.0)
+            with cols[1]:
+                cartao = st.number_input("Cartão (R$)*", min_value=0.0, step=10.0)
+            with cols[2]:
+                pix = st.number_input("PIX (R$)*", min_value=0.0, step=10.0)
+
+            if st.form_submit_button("✅ Salvar Registro"):
+                if dinheiro + cartao + pix <= 0:
+                    st.error("O total do dia deve ser maior que zero!")
+                else:
+                    novo = pd.DataFrame({'Data': [pd.Timestamp(data)], 'Dinheiro': [dinheiro], 'Cartao': [cartao], 'Pix': [pix]})
+                    st.session_state.df_receipts = pd.concat([st.session_state.df_receipts, novo], ignore_index=True)\
+                        .sort_values('Data', ascending=False, ignore_index=True)
+                    save_data(st.session_state.df_receipts)
+                    st.rerun()
+
+    df_receipts = st.session_state.df_receipts
+    if df_receipts.empty:
+        st.info("Nenhum dado cadastrado ainda. Adicione seu primeiro registro acima.")
+    else:
+        st.subheader("📅 Filtros de Período")
+        filtro_tipo = st.radio("Tipo de Filtro:", ["Intervalo de Datas", "Mês Específico"], horizontal=True)
+        if filtro_tipo == "Intervalo de Datas":
+            cols = st.columns(2)
+            with cols[0]:
+                inicio = st.date_input("Data inicial", value=df_receipts['Data'].min())
+            with cols[1]:
+                fim = st.date_input("Data final", value=df_receipts['Data'].max())
+            inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+        else:
+            meses_disponiveis = sorted(df_receipts['Data'].dt.to_period('M').unique(), reverse=True)
+            mes_selecionado = st.selectbox("Selecione o mês:", options=meses_disponiveis,
+                                           format_func=lambda p: p.strftime('%m/%Y'))
+            inicio, fim = mes_selecionado.start_time, mes_selecionado.end_time.normalize()
+
+        df_filtered = df_receipts[df_receipts['Data'].dt.normalize().between(inicio, fim)]
+        if df_filtered.empty:
+            st.warning("Nenhum registro encontrado no período selecionado")
+        else:
+            df_filtered = df_filtered.assign(Total=df_filtered[['Dinheiro', 'Cartao', 'Pix']].sum(axis=1))
+            totais = {'Dinheiro': df_filtered['Dinheiro'].sum(), 'Cartão': df_filtered['Cartao'].sum(),
+                      'PIX': df_filtered['Pix'].sum()}
+
+            st.subheader("📊 Resumo do Período")
+            cols1 = st.columns(4)
+            cols2 = st.columns(4)
+            with cols1[0]:
+                st.metric("Dinheiro", format_currency(totais['Dinheiro']))
+            with cols1[1]:
+                st.metric("Cartão", format_currency(totais['Cartão']))
+            with cols1[2]:
+                st.metric("PIX", format_currency(totais['PIX']))
+            with cols1[3]:
+                st.metric("Total Geral", format_currency(sum(totais.values())))
+            with cols2[0]:
+                st.metric("Média Diária", format_currency(df_filtered['Total'].mean()))
+            with cols2[1]:
+                st.metric("Maior Venda", format_currency(df_filtered['Total'].max()),
+                          help=f"Dia: {df_filtered.loc[df_filtered['Total'].idxmax(), 'Data'].strftime('%d/%m/%Y')}")
+            with cols2[2]:
+                st.metric("Dias Registrados", len(df_filtered))
+            with cols2[3]:
+                st.metric("Dias sem Registro", max((fim - inicio).days + 1 - df_filtered['Data'].dt.normalize().nunique(), 0))
+
+            st.subheader("📈 Visualizações Gráficas")
+            granularidade = escolher_granularidade(inicio, fim)
+            agregado = agregar_recebimentos(df_filtered, granularidade)
+            st.caption(f"Agrupado por {granularidade[1].lower()} ({len(agregado)} pontos).")
+            tab_graficos1, tab_graficos2, tab_graficos3 = st.tabs(["Distribuição", "Comparação", "Acumulado"])
+
+            with tab_graficos1:
+                df_pie = pd.DataFrame({'Forma': list(totais), 'Valor': list(totais.values())})
+                st.altair_chart(create_altair_chart(df_pie, 'pie', 'Forma', 'Valor', title='Distribuição dos Recebimentos',
+                                                    interactive=False), use_container_width=True)
+
+            with tab_graficos2:
+                df_bar = agregado.melt(id_vars=['Rótulo'], value_vars=['Dinheiro', 'Cartão', 'PIX'],
+                                       var_name='Forma', value_name='Valor')
+                bar_chart = alt.Chart(df_bar).mark_bar().encode(
+                    x=alt.X('Rótulo:O', sort=None, title=granularidade[1]),
+                    y=alt.Y('Valor:Q', stack=True, title='Valor (R$)'),
+                    color='Forma',
+                    tooltip=[alt.Tooltip('Rótulo:O', title=granularidade[1]), 'Forma', alt.Tooltip('Valor:Q', format=',.2f')]
+                ).properties(height=400, title='Vendas por Forma de Pagamento')
+                st.altair_chart(bar_chart, use_container_width=True)
+
+            with tab_graficos3:
+                line_chart = alt.Chart(agregado[['Início', 'Rótulo', 'Acumulado']]).mark_line(
+                    point=len(agregado) <= 60, strokeWidth=3, color='red'
+                ).encode(
+                    x=alt.X('Início:T', title=granularidade[1]),
+                    y=alt.Y('Acumulado:Q', title='Acumulado (R$)'),
+                    tooltip=[alt.Tooltip('Rótulo:O', title=granularidade[1]), alt.Tooltip('Acumulado:Q', format=',.2f')]
+                ).properties(height=400, title='Receita Total Acumulada')
+                st.altair_chart(line_chart, use_container_width=True)
+
+            st.subheader("📋 Dados Detalhados")
+            colunas_tabela = st.multiselect("Colunas exibidas:", options=list(COLUNAS_DETALHE), default=list(COLUNAS_DETALHE),
+                                            format_func=COLUNAS_DETALHE.get, key="detalhe_colunas")
+            cols = st.columns([2, 1, 1, 1])
+            with cols[0]:
+                ordenar_por = st.selectbox("Ordenar por:", options=list(COLUNAS_DETALHE), format_func=COLUNAS_DETALHE.get,
+                                           key="detalhe_ordem")
+            with cols[1]:
+                crescente = st.radio("Ordem:", ["Decrescente", "Crescente"], horizontal=True,
+                                     key="detalhe_sentido") == "Crescente"
+            with cols[2]:
+                por_pagina = st.selectbox("Linhas por página:", options=OPCOES_POR_PAGINA, index=1, key="detalhe_por_pagina")
+            paginas = total_de_paginas(len(df_filtered), por_pagina)
+            # A página vive só no session_state (sem value= no widget): um filtro mais curto pode deixá-la além da última
+            if "detalhe_pagina" not in st.session_state:
+                st.session_state["detalhe_pagina"] = 1
+            elif st.session_state["detalhe_pagina"] > paginas:
+                st.session_state["detalhe_pagina"] = paginas
+            with cols[3]:
+                pagina = st.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, step=1,
+                                         key="detalhe_pagina")
+
+            if not colunas_tabela:
+                st.info("Selecione ao menos uma coluna para exibir.")
+            else:
+                st.dataframe(pagina_recebimentos(df_filtered, colunas_tabela, ordenar_por, crescente, pagina, por_pagina),
+                             use_container_width=True, hide_index=True)
+                primeira = (pagina - 1) * por_pagina + 1
+                st.caption(f"Registros {primeira}–{min(pagina * por_pagina, len(df_filtered))} de {len(df_filtered)}.")
+
+# --- CONTEÚDO DAS ABAS ---
+
+if escolha_menu == "📈 Resumo das Vendas":
+    st.header("📤 Upload de Dados")
+    arquivo = st.file_uploader("Envie o arquivo de transações (.csv ou .xlsx)", 
+                             type=["csv", "xlsx"])
+
+    if arquivo:
+        st.session_state.tarefa_ingestao = iniciar_ingestao(arquivo.getvalue(), arquivo.name, arquivo.file_id)
+    tarefa = st.session_state.tarefa_ingestao
+
+    if tarefa and not tarefa['concluida']:
+        acompanhar_ingestao(tarefa)
+    elif tarefa:
+        secao_resumo_vendas(tarefa)
+    else:
+        st.info("Aguardando upload do arquivo de transações.")
+
+elif escolha_menu == "🧩 Detalhes das Combinações":
+    secao_combinacoes(drink_percentage, population_size, generations, tamanho_combinacao_sanduiches, tamanho_combinacao_bebidas)
+    # Fora do fragmento da seção: o Streamlit não aninha fragmentos
+    if st.session_state.calculo_arquivo and st.session_state.calculo_arquivo['status'] in CALCULOS_ATIVOS:
+        acompanhar_calculo('calculo_arquivo')
+
+elif escolha_menu == "💸 Calculadora PIX":
+    secao_calculadora_pix(drink_percentage, population_size, generations, tamanho_combinacao_sanduiches, tamanho_combinacao_bebidas)
+    if st.session_state.calculo_pix and st.session_state.calculo_pix['status'] in CALCULOS_ATIVOS:
+        acompanhar_calculo('calculo_pix')
+
+elif escolha_menu == "🧾 Conciliação":
+    st.header("🧾 Conciliação de Recebimentos")
+    st.markdown("Compara, dia a dia, os valores de Cartão e PIX do extrato da adquirente com os fechamentos registrados.")
+
+    df_transacoes = st.session_state.uploaded_data
+    if df_transacoes is None or 'Data' not in df_transacoes.columns or df_transacoes['Data'].isna().all():
+        st.info("Faça o upload de um extrato com data das transações na aba 'Resumo das Vendas'.")
+    elif st.session_state.df_receipts.empty:
+        st.info("Nenhum recebimento registrado em recebimentos.xlsx.")
+    else:
+        tolerancia = st.number_input("Tolerância por dia (R$)", min_value=0.0, value=1.0, step=0.5)
+        conciliacao = conciliar_recebimentos(df_transacoes, st.session_state.df_receipts, tolerancia)
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Dias Conciliados", int((conciliacao['Status'] == 'OK').sum()))
+        with col2:
+            st.metric("Dias Divergentes", int((conciliacao['Status'] == 'Divergente').sum()))
+        with col3:
+            st.metric("Dias sem Registro", int((conciliacao['Status'] == 'Sem registro').sum()))
+        with col4:
+            st.metric("Dias sem Transações", int((conciliacao['Status'] == 'Sem transações').sum()))
+
+        so_problemas = st.checkbox("Mostrar apenas dias com problema", value=True)
+        if so_problemas:
+            conciliacao = conciliacao[conciliacao['Status'] != 'OK']
+
+        colunas_valor = [c for c in conciliacao.columns if c not in ('Data', 'Status')]
+        html_conc = conciliacao.style.format({'Data': '{:%d/%m/%Y}', **{c: format_currency for c in colunas_valor}})\
+            .set_table_styles(get_global_centered_styles()).hide(axis='index').to_html()
+        st.markdown(html_conc, unsafe_allow_html=True)
+
+elif escolha_menu == "💰 Recebimentos":
+    secao_recebimentos()
+
 # Adicionar rodapé
 st.divider()
 st.markdown(
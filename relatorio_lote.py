@@ -0,0 +1,193 @@
+"""Geração em lote dos relatórios PDF mensais a partir do histórico de recebimentos.
+
+Uso: python relatorio_lote.py [--recebimentos recebimentos.xlsx] [--saida relatorios] [--processos N]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from financeiro import TAXAS_ADQUIRENTE, ler_recebimentos, ler_equipe, tabela_simples_mensal, cronograma_folha, dre_mensal
+from relatorio_pdf import create_pdf_report
+
+MANIFESTO = ".manifesto.json"
+
+
+def taxas_medias_padrao():
+    """Taxa média de cartão e do PIX pela tabela padrão da adquirente, em fração.
+
+    O histórico de recebimentos só tem o total de cartão, sem a forma de cada venda: a taxa de cartão é a média
+    entre a média das bandeiras no crédito e a das bandeiras no débito (Voucher fica de fora).
+    """
+    medias = []
+    for tipo in ('Crédito', 'Débito'):
+        bandeiras = [t['percentual'] for forma, t in TAXAS_ADQUIRENTE.items() if forma.startswith(tipo)]
+        medias.append(sum(bandeiras) / len(bandeiras))
+    return sum(medias) / len(medias) / 100, TAXAS_ADQUIRENTE['PIX']['percentual'] / 100
+
+
+def hash_entradas(entradas):
+    """Impressão digital de tudo que vai para o PDF de um mês: tabelas e valores escalares."""
+    h = hashlib.sha1()
+    for chave in sorted(entradas):
+        valor = entradas[chave]
+        h.update(chave.encode())
+        if isinstance(valor, pd.DataFrame):
+            h.update(valor.columns.astype(str).str.cat(sep='|').encode())
+            h.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+        else:
+            h.update(repr(valor).encode())
+    return h.hexdigest()
+
+
+def entradas_mensais(df_receipts, equipe, aliquota_inss, custo_contadora, taxa_cartao, taxa_pix):
+    """Argumentos de `create_pdf_report` para cada mês do histórico, calculados de uma vez no processo principal."""
+    dre, _ = dre_mensal(df_receipts, equipe, aliquota_inss, custo_contadora, taxa_cartao, taxa_pix)
+    if dre.empty:
+        return {}
+    historico = tabela_simples_mensal(df_receipts)
+    folha = cronograma_folha(equipe, dre['Mês'].min() - 11, dre['Mês'].max(), aliquota_inss)
+    meses = pd.to_datetime(df_receipts['Data']).dt.to_period('M')
+    por_mes = df_receipts[['Dinheiro', 'Cartao', 'Pix']].groupby(meses).sum()
+
+    entradas = {}
+    for i, linha in dre.iterrows():
+        mes = linha['Mês']
+        if linha['Faturamento'] <= 0:
+            continue
+        recebido = por_mes.loc[mes]
+        vendas = pd.DataFrame({
+            'Forma': ['Dinheiro', 'Cartão', 'PIX'],
+            'Valor': [recebido['Dinheiro'], recebido['Cartao'], recebido['Pix']],
+            'Taxa': [0.0, recebido['Cartao'] * taxa_cartao, recebido['Pix'] * taxa_pix]
+        })
+        vendas['Liquido'] = vendas['Valor'] - vendas['Taxa']
+        vendas = vendas[vendas['Valor'] > 0].reset_index(drop=True)
+        entradas[mes] = {
+            'vendas': vendas,
+            'total_vendas': float(linha['Faturamento']),
+            'imposto_simples': float(linha['Simples']),
+            'custo_funcionario': float(linha['Folha']),
+            'custo_contadora': float(linha['Contadora']),
+            'total_custos': float(linha['Custos']),
+            'lucro_estimado': float(linha['Lucro']),
+            'taxas_adquirente': float(linha['Taxas MDR']),
+            'aliquota_simples': float(historico.loc[historico['Mês'] == mes, 'Alíquota Efetiva'].iloc[0]),
+            'historico_simples': historico[historico['Mês'] <= mes].tail(12).reset_index(drop=True),
+            'folha_pagamento': folha[(folha['Mês'] > mes - 12) & (folha['Mês'] <= mes)].reset_index(drop=True),
+            'dre': dre.iloc[max(0, i - 11):i + 1].reset_index(drop=True),
+            'recebimentos': df_receipts.loc[meses == mes, ['Data', 'Dinheiro', 'Cartao', 'Pix']].reset_index(drop=True)
+        }
+    return entradas
+
+
+def gerar_relatorio_mes(caminho, entradas, logo_path):
+    # Executado nos processos do pool: só monta o PDF com as entradas já calculadas
+    buffer = create_pdf_report(pd.DataFrame(), logo_path=logo_path, **entradas)
+    with open(caminho, 'wb') as f:
+        f.write(buffer.getvalue())
+    return caminho
+
+
+def gerar_relatorios_mensais(df_receipts, equipe, pasta_saida, aliquota_inss=0.0, custo_contadora=316.0,
+                             taxa_cartao=None, taxa_pix=None, logo_path="logo.png", processos=None,
+                             ao_concluir=None):
+    """Gera `relatorio_AAAA-MM.pdf` de cada mês em processos paralelos, pulando os meses com entradas inalteradas.
+
+    Retorna um dict com as listas de meses 'gerados', 'inalterados' e 'erros' e o tempo total.
+    """
+    inicio = time.time()
+    padrao_cartao, padrao_pix = taxas_medias_padrao()
+    taxa_cartao = padrao_cartao if taxa_cartao is None else taxa_cartao
+    taxa_pix = padrao_pix if taxa_pix is None else taxa_pix
+    entradas = entradas_mensais(df_receipts, equipe, aliquota_inss, custo_contadora, taxa_cartao, taxa_pix)
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    caminho_manifesto = os.path.join(pasta_saida, MANIFESTO)
+    manifesto = {}
+    if os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            manifesto = json.load(f)
+
+    # O logo entra no hash pela data de modificação: trocá-lo regenera todos os meses
+    versao_logo = os.path.getmtime(logo_path) if os.path.exists(logo_path) else None
+    pendentes, inalterados = {}, []
+    for mes, args in entradas.items():
+        chave = str(mes)
+        assinatura = hash_entradas({**args, 'logo': versao_logo})
+        caminho = os.path.join(pasta_saida, f"relatorio_{chave}.pdf")
+        if manifesto.get(chave) == assinatura and os.path.exists(caminho):
+            inalterados.append(chave)
+        else:
+            pendentes[chave] = (caminho, assinatura)
+
+    gerados, erros = [], {}
+    if pendentes:
+        # "spawn": o processo pai pode ser o servidor do Streamlit, com várias threads ativas
+        contexto = multiprocessing.get_context("spawn")
+        processos = min(processos or os.cpu_count() or 1, len(pendentes))
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            futuros = {
+                executor.submit(gerar_relatorio_mes, caminho, entradas[pd.Period(chave, 'M')], logo_path): chave
+                for chave, (caminho, _) in pendentes.items()
+            }
+            for n, futuro in enumerate(as_completed(futuros), start=1):
+                chave = futuros[futuro]
+                try:
+                    futuro.result()
+                    gerados.append(chave)
+                    manifesto[chave] = pendentes[chave][1]
+                except Exception as e:
+                    erros[chave] = str(e)
+                if ao_concluir:
+                    ao_concluir(n, len(pendentes), chave)
+
+        with open(caminho_manifesto, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, indent=2, sort_keys=True)
+
+    return {
+        'gerados': sorted(gerados),
+        'inalterados': sorted(inalterados),
+        'erros': erros,
+        'pasta': pasta_saida,
+        'tempo': time.time() - inicio
+    }
+
+
+if __name__ == "__main__":
+    from streamlit.logger import set_log_level
+
+    from financeiro import OPCOES_INSS_PATRONAL
+
+    parser = argparse.ArgumentParser(description="Gera os relatórios PDF mensais do histórico de recebimentos.")
+    parser.add_argument("--recebimentos", default="recebimentos.xlsx")
+    parser.add_argument("--equipe", default="funcionarios.xlsx")
+    parser.add_argument("--saida", default="relatorios")
+    parser.add_argument("--logo", default="logo.png")
+    parser.add_argument("--inss", type=float, default=0.0, choices=sorted(OPCOES_INSS_PATRONAL.values()),
+                        help="alíquota patronal do INSS sobre a folha")
+    parser.add_argument("--contadora", type=float, default=316.0, help="custo mensal da contadora (R$)")
+    parser.add_argument("--taxa-cartao", type=float,
+                        help="taxa média de cartão em %% (padrão: média de crédito e débito da tabela MDR)")
+    parser.add_argument("--taxa-pix", type=float, help="taxa do PIX em %% (padrão: tabela MDR)")
+    parser.add_argument("--processos", type=int, help="número de processos (padrão: núcleos disponíveis)")
+    args = parser.parse_args()
+    set_log_level("error")  # sem o servidor do Streamlit os caches avisam a cada chamada
+
+    resultado = gerar_relatorios_mensais(
+        ler_recebimentos(args.recebimentos), ler_equipe(args.equipe), args.saida,
+        aliquota_inss=args.inss, custo_contadora=args.contadora,
+        taxa_cartao=None if args.taxa_cartao is None else args.taxa_cartao / 100,
+        taxa_pix=None if args.taxa_pix is None else args.taxa_pix / 100,
+        logo_path=args.logo, processos=args.processos,
+        ao_concluir=lambda n, total, mes: print(f"[{n}/{total}] relatorio_{mes}.pdf")
+    )
+    print(f"{len(resultado['gerados'])} gerado(s), {len(resultado['inalterados'])} sem alteração, "
+          f"{len(resultado['erros'])} erro(s) em {resultado['tempo']:.1f}s -> {resultado['pasta']}")
+    for mes, erro in resultado['erros'].items():
+        print(f"  {mes}: {erro}")
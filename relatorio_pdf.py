@@ -0,0 +1,399 @@
+import os
+import io
+from io import BytesIO
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image as PILImage
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, LongTable, TableStyle, PageBreak, Flowable
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.piecharts import Pie
+
+from formatacao import format_currency, format_currency_series, format_percent
+
+# Mesma sequência de cores do matplotlib (tab10), para os gráficos vetoriais manterem a aparência
+CORES_GRAFICO = [colors.HexColor(c) for c in
+                 ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b')]
+
+# Listagens completas: linhas por LongTable e altura fixa de cada linha (pt)
+LINHAS_POR_BLOCO = 500
+ALTURA_LINHA_DETALHE = 11
+
+# --- FUNÇÕES PARA GERAR PDF ---
+FORM_MARCA_DAGUA = "marca_dagua"
+
+@lru_cache(maxsize=8)
+def preparar_logo(logo_path, modificado_em, lado_max, opacidade=1.0):
+    """PNG do logo reduzido para `lado_max` px e já esmaecido sobre fundo branco; preparado uma vez por processo."""
+    with PILImage.open(logo_path) as original:
+        logo = original.convert('RGBA')
+    logo.thumbnail((lado_max, lado_max), PILImage.LANCZOS)
+    if opacidade < 1:
+        logo.putalpha(logo.getchannel('A').point(lambda a: round(a * opacidade)))
+    fundo = PILImage.new('RGBA', logo.size, (255, 255, 255, 255))
+    buf = BytesIO()
+    PILImage.alpha_composite(fundo, logo).convert('RGB').save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
+
+def create_watermark(canvas, logo_path, width=400, height=400, opacity=0.1):
+    # A imagem vai para um form XObject na primeira página; as demais só referenciam o form
+    try:
+        if not canvas.hasForm(FORM_MARCA_DAGUA):
+            if not os.path.exists(logo_path):
+                return
+            # 2 px por ponto: nitidez de ~144 dpi, bem abaixo do logo original de 1024 px
+            logo = preparar_logo(logo_path, os.path.getmtime(logo_path), 2 * max(width, height), opacity)
+            canvas.beginForm(FORM_MARCA_DAGUA)
+            canvas.drawImage(ImageReader(BytesIO(logo)), (A4[0] - width) / 2, (A4[1] - height) / 2,
+                             width=width, height=height, preserveAspectRatio=True)
+            canvas.endForm()
+        canvas.doForm(FORM_MARCA_DAGUA)
+    except Exception as e:
+        print(f"Erro ao adicionar marca d'água: {e}")
+
+def fig_to_buffer(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+    buf.seek(0)
+    return buf
+
+def nova_figura(largura, altura):
+    # API orientada a objetos do Agg: sem o estado global do pyplot, segura entre sessões/threads
+    fig = Figure(figsize=(largura / 72, altura / 72))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+@lru_cache(maxsize=32)
+def png_vendas(formas, valores, largura, altura):
+    """PNG do gráfico de vendas; o lru_cache usa os próprios dados e o tamanho como chave."""
+    fig, ax = nova_figura(largura, altura)
+    ax.bar(formas, valores, color='steelblue')
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.set_title('Vendas por Forma de Pagamento')
+    ax.set_ylabel('Valor (R$)')
+    fig.tight_layout()
+    return fig_to_buffer(fig).getvalue()
+
+@lru_cache(maxsize=32)
+def png_custos(itens, valores, largura, altura):
+    fig, ax = nova_figura(largura, altura)
+    ax.pie(valores, labels=itens, autopct='%1.1f%%', startangle=90, shadow=True)
+    ax.set_title('Composição dos Custos')
+    fig.tight_layout()
+    return fig_to_buffer(fig).getvalue()
+
+def grafico_vendas_raster(vendas, largura, altura):
+    png = png_vendas(tuple(vendas['Forma'].astype(str)), tuple(vendas['Valor'].astype(float)), largura, altura)
+    return Image(BytesIO(png), width=largura, height=altura)
+
+def grafico_custos_raster(custos_df, largura, altura):
+    png = png_custos(tuple(custos_df['Item'].astype(str)), tuple(custos_df['Valor'].astype(float)), largura, altura)
+    return Image(BytesIO(png), width=largura, height=altura)
+
+def titulo_grafico(desenho, texto):
+    desenho.add(String(desenho.width / 2, desenho.height - 14, texto, textAnchor='middle',
+                       fontName='Helvetica-Bold', fontSize=12))
+
+def grafico_vendas_vetorial(vendas, largura, altura):
+    """Gráfico de barras das vendas por forma de pagamento, desenhado em vetores no próprio PDF."""
+    desenho = Drawing(largura, altura)
+    titulo_grafico(desenho, 'Vendas por Forma de Pagamento')
+    barras = VerticalBarChart()
+    barras.x, barras.y = 60, 55
+    barras.width, barras.height = largura - 75, altura - 85
+    barras.data = [vendas['Valor'].astype(float).tolist()]
+    barras.bars[0].fillColor = colors.steelblue
+    barras.bars[0].strokeColor = None
+    barras.valueAxis.valueMin = 0
+    barras.valueAxis.labels.fontName = 'Helvetica'
+    barras.valueAxis.labels.fontSize = 7
+    barras.valueAxis.labelTextFormat = lambda v: format_currency(v).replace(',00', '')
+    barras.categoryAxis.categoryNames = vendas['Forma'].astype(str).tolist()
+    barras.categoryAxis.labels.angle = 30
+    barras.categoryAxis.labels.boxAnchor = 'ne'
+    barras.categoryAxis.labels.fontName = 'Helvetica'
+    barras.categoryAxis.labels.fontSize = 7
+    desenho.add(barras)
+    return desenho
+
+def grafico_custos_vetorial(custos_df, largura, altura):
+    """Gráfico de pizza da composição dos custos, desenhado em vetores no próprio PDF."""
+    desenho = Drawing(largura, altura)
+    titulo_grafico(desenho, 'Composição dos Custos')
+    valores = custos_df['Valor'].astype(float).tolist()
+    total = sum(valores)
+    pizza = Pie()
+    pizza.height = pizza.width = altura - 70
+    pizza.x, pizza.y = (largura - pizza.width) / 2, 25
+    pizza.data = valores
+    pizza.labels = [f"{item} ({valor / total:.1%})".replace('.', ',')
+                    for item, valor in zip(custos_df['Item'], valores)]
+    pizza.startAngle = 90
+    pizza.direction = 'anticlockwise'
+    pizza.slices.strokeColor = colors.white
+    pizza.slices.fontName = 'Helvetica'
+    pizza.slices.fontSize = 8
+    for i, cor in enumerate(CORES_GRAFICO[:len(valores)]):
+        pizza.slices[i].fillColor = cor
+    desenho.add(pizza)
+    return desenho
+
+def criar_tabela_detalhe(data, col_widths):
+    table = Table(data, colWidths=col_widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    return table
+
+def moeda(valores):
+    return format_currency_series(valores).tolist()
+
+def percentual(valores):
+    return [format_percent(v) for v in valores]
+
+def mes_ano(meses):
+    return pd.PeriodIndex(meses, freq='M').strftime('%m/%Y').tolist()
+
+def linhas_tabela(cabecalho, colunas):
+    """Cabeçalho + linhas montadas a partir de colunas já formatadas (zip das listas, sem iterrows)."""
+    return [cabecalho] + [list(linha) for linha in zip(*colunas)]
+
+class BlocosSobDemanda(Flowable):
+    """Marcador sem altura que, ao ser desenhado, põe o próximo bloco do gerador (e a si mesmo) de volta na fila
+    do documento: só um bloco da listagem existe por vez, em vez de todos montados antes do doc.build."""
+
+    def __init__(self, blocos):
+        super().__init__()
+        self.blocos = blocos
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        bloco = next(self.blocos, None)
+        if bloco is not None:
+            self._doctemplateAttr('frame').add_generated_content(bloco, self)
+
+def secao_detalhada(titulo, cabecalho, df, formatar, col_widths, estilo_titulo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Listagem completa em LongTables de `linhas_por_bloco` linhas, com o cabeçalho repetido a cada página.
+
+    `formatar(trecho)` devolve as colunas já formatadas de um trecho de `df`. Os blocos são formatados e montados
+    um a um durante o doc.build, então a memória não cresce com o número de linhas. Altura de linha fixa:
+    o reportlab não precisa medir cada célula, e blocos limitados mantêm a quebra de página linear.
+    """
+    titulo = f"{titulo} ({len(df):,} linhas)".replace(',', '.')
+    estilo = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('LEADING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ])
+
+    def blocos():
+        for inicio in range(0, len(df), linhas_por_bloco):
+            bloco = linhas_tabela(cabecalho, formatar(df.iloc[inicio:inicio + linhas_por_bloco]))
+            tabela = LongTable(bloco, colWidths=col_widths, rowHeights=[ALTURA_LINHA_DETALHE] * len(bloco), repeatRows=1)
+            tabela.setStyle(estilo)
+            yield tabela
+
+    return [PageBreak(), Paragraph(titulo, estilo_titulo), Spacer(1, 0.1*inch), BlocosSobDemanda(blocos())]
+
+def detalhe_recebimentos(recebimentos, largura, estilo_titulo):
+    recebimentos = recebimentos.sort_values('Data')
+
+    def formatar(trecho):
+        valores = trecho[['Dinheiro', 'Cartao', 'Pix']].fillna(0.0)
+        colunas = [pd.to_datetime(trecho['Data']).dt.strftime('%d/%m/%Y').tolist()]
+        colunas += [moeda(valores[c].to_numpy()) for c in valores.columns]
+        colunas.append(moeda(valores.sum(axis=1).to_numpy()))
+        return colunas
+
+    return secao_detalhada("Recebimentos Diários", ["Data", "Dinheiro", "Cartão", "PIX", "Total"], recebimentos,
+                           formatar, [largura / 5] * 5, estilo_titulo)
+
+def detalhe_transacoes(df, largura, estilo_titulo):
+    cabecalho = []
+    if 'Data' in df.columns:
+        df = df.sort_values('Data', kind='stable')
+        cabecalho.append("Data/Hora")
+    cabecalho.append("Forma de Pagamento")
+    monetarias = [(coluna, titulo) for coluna, titulo in [('Valor', "Valor"), ('Taxa', "Taxa"), ('Liquido', "Líquido")]
+                  if coluna in df.columns]
+    cabecalho += [titulo for _, titulo in monetarias]
+
+    def formatar(trecho):
+        colunas = []
+        if 'Data' in trecho.columns:
+            colunas.append(trecho['Data'].dt.strftime('%d/%m/%Y %H:%M').fillna('-').tolist())
+        colunas.append(trecho['Forma'].astype(str).tolist())
+        colunas += [moeda(trecho[coluna].to_numpy()) for coluna, _ in monetarias]
+        return colunas
+
+    larguras = [largura / len(cabecalho)] * len(cabecalho)
+    return secao_detalhada("Transações", cabecalho, df, formatar, larguras, estilo_titulo)
+
+def create_pdf_report(df, vendas, total_vendas, imposto_simples, custo_funcionario, 
+                    custo_contadora, total_custos, lucro_estimado, logo_path, taxas_adquirente=0.0,
+                    aliquota_simples=0.06, historico_simples=None, folha_pagamento=None, dre=None,
+                    recebimentos=None, detalhar_transacoes=False, graficos_vetoriais=True):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
+    styles = getSampleStyleSheet()
+    title_style = styles['Title']
+    heading_style = styles['Heading1']
+    subheading_style = styles['Heading2']
+    normal_style = styles['Normal']
+    elements = []
+    
+    try:
+        if os.path.exists(logo_path):
+            img = Image(BytesIO(preparar_logo(logo_path, os.path.getmtime(logo_path), 400)), width=2*inch, height=1.5*inch)
+            img.hAlign = 'CENTER'
+            elements.append(img)
+            elements.append(Spacer(1, 0.5*inch))
+    except Exception as e:
+        print(f"Erro ao adicionar logo: {e}")
+    
+    elements.append(Paragraph("Relatório Financeiro - Clips Burger", title_style))
+    elements.append(Spacer(1, 0.5*inch))
+    elements.append(Paragraph(f"Data do relatório: {datetime.now().strftime('%d/%m/%Y')}", normal_style))
+    elements.append(Spacer(1, 0.25*inch))
+    elements.append(Paragraph("Resumo Financeiro", heading_style))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    data = [
+        ["Métrica", "Valor"],
+        ["Faturamento Bruto", format_currency(total_vendas)],
+        [f"Imposto Simples ({format_percent(aliquota_simples)})", format_currency(imposto_simples)],
+        ["Custo Funcionários CLT", format_currency(custo_funcionario)],
+        ["Custo Contadora", format_currency(custo_contadora)],
+        ["Taxas da Adquirente", format_currency(taxas_adquirente)],
+        ["Total de Custos", format_currency(total_custos)],
+        ["Lucro Estimado", format_currency(lucro_estimado)]
+    ]
+    
+    table = Table(data, colWidths=[doc.width/2.5, doc.width/2.5])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (1, 0), 12),
+        ('BACKGROUND', (0, -1), (1, -1), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 0.5*inch))
+    
+    elements.append(Paragraph("Análise de Vendas", heading_style))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    custos_df = pd.DataFrame({
+        'Item': ['Impostos', 'Funcionário', 'Contadora', 'Taxas Adquirente'],
+        'Valor': [imposto_simples, custo_funcionario, custo_contadora, taxas_adquirente]
+    })
+    custos_df = custos_df[custos_df['Valor'] > 0]
+    graficos = [
+        ("vendas", grafico_vendas_vetorial if graficos_vetoriais else grafico_vendas_raster, vendas),
+        ("custos", grafico_custos_vetorial if graficos_vetoriais else grafico_custos_raster, custos_df)
+    ]
+    for nome, construir, dados in graficos:
+        try:
+            elements.append(construir(dados, doc.width, 4*inch))
+            elements.append(Spacer(1, 0.25*inch))
+        except Exception as e:
+            elements.append(Paragraph(f"Erro ao gerar gráfico de {nome}: {e}", normal_style))
+    
+    elements.append(Spacer(1, 0.5*inch))
+    elements.append(Paragraph("Detalhamento por Forma de Pagamento", subheading_style))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    if 'Taxa' in vendas.columns:
+        data = linhas_tabela(["Forma de Pagamento", "Valor", "Taxa", "Líquido"],
+                             [vendas['Forma'].tolist()] + [moeda(vendas[c].to_numpy()) for c in ['Valor', 'Taxa', 'Liquido']])
+        col_widths = [doc.width/3, doc.width/4.5, doc.width/4.5, doc.width/4.5]
+    else:
+        data = linhas_tabela(["Forma de Pagamento", "Valor"], [vendas['Forma'].tolist(), moeda(vendas['Valor'].to_numpy())])
+        col_widths = [doc.width/2, doc.width/4]
+    
+    table = Table(data, colWidths=col_widths)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    elements.append(table)
+
+    if historico_simples is not None and not historico_simples.empty:
+        elements.append(Spacer(1, 0.5*inch))
+        elements.append(Paragraph("Histórico do Simples Nacional (Anexo I)", subheading_style))
+        elements.append(Spacer(1, 0.1*inch))
+        data = linhas_tabela(["Mês", "Faturamento", "RBT12", "Alíquota Efetiva", "Imposto"], [
+            mes_ano(historico_simples['Mês']), moeda(historico_simples['Faturamento'].to_numpy()),
+            moeda(historico_simples['RBT12'].to_numpy()), percentual(historico_simples['Alíquota Efetiva'].to_numpy()),
+            moeda(historico_simples['Imposto'].to_numpy())
+        ])
+        elements.append(criar_tabela_detalhe(data, [doc.width/7, doc.width/4.5, doc.width/4.5, doc.width/6, doc.width/5]))
+
+    if folha_pagamento is not None and not folha_pagamento.empty:
+        elements.append(Spacer(1, 0.5*inch))
+        elements.append(Paragraph("Folha de Pagamento Provisionada", subheading_style))
+        elements.append(Spacer(1, 0.1*inch))
+        folha = folha_pagamento.tail(12)
+        data = linhas_tabela(["Mês", "Funcionários", "Salários", "Encargos", "Provisões", "Total"], [
+            mes_ano(folha['Mês']), folha['Funcionários'].astype(int).astype(str).tolist(), moeda(folha['Salários'].to_numpy()),
+            moeda((folha['FGTS'] + folha['INSS Patronal']).to_numpy()),
+            moeda((folha['Férias + 1/3'] + folha['13º Salário']).to_numpy()), moeda(folha['Total'].to_numpy())
+        ])
+        elements.append(criar_tabela_detalhe(data, [doc.width/8, doc.width/7, doc.width/5.5, doc.width/5.5, doc.width/5.5, doc.width/5.5]))
+
+    if dre is not None and not dre.empty:
+        elements.append(Spacer(1, 0.5*inch))
+        elements.append(Paragraph("Demonstrativo de Resultado Mensal", subheading_style))
+        elements.append(Spacer(1, 0.1*inch))
+        ultimos = dre.tail(12)
+        data = linhas_tabela(["Mês", "Faturamento", "Simples", "Taxas", "Folha", "Contadora", "Lucro"],
+                             [mes_ano(ultimos['Mês'])] + [moeda(ultimos[c].to_numpy()) for c in
+                                                          ['Faturamento', 'Simples', 'Taxas MDR', 'Folha', 'Contadora', 'Lucro']])
+        elements.append(criar_tabela_detalhe(data, [doc.width/9] + [doc.width/6.9] * 6))
+
+    if recebimentos is not None and not recebimentos.empty:
+        elements.extend(detalhe_recebimentos(recebimentos, doc.width, subheading_style))
+    if detalhar_transacoes and df is not None and not df.empty:
+        elements.extend(detalhe_transacoes(df, doc.width, subheading_style))
+
+    elements.append(Spacer(1, inch))
+    footer_text = "Este relatório foi gerado automaticamente pelo Sistema de Gestão da Clips Burger."
+    elements.append(Paragraph(footer_text, normal_style))
+    
+    def add_watermark(canvas, doc):
+        create_watermark(canvas, logo_path, width=300, height=300, opacity=0.1)
+    
+    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
+    buffer.seek(0)
+    return buffer